@@ -0,0 +1,216 @@
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import yaml
+
+# Bump when the layout of the results file changes
+SCHEMA_VERSION = 1
+CODE_PATHS = ['single', 'batched', 'scanner']
+MAX_REGRESSION = 0.10
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None where the platform does not report it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return rss / 1024 if platform.system() != 'Darwin' else rss / 2**20
+
+
+def config_key(config):
+    return f"{config['path']}/{config['backend']}/imgsz{config['imgsz']}/threads{config['threads']}/batch{config['batch']}"
+
+
+def _run_config(config, image_paths, weights, warmup, out_dir, result_queue):
+    """Benchmark one configuration, run in a fresh process so peak RSS is per configuration"""
+    import cv2
+    import torch
+    from inference_backend import load_model
+    from predict import predict_and_save, predict_batch_and_save
+    from bonus_app.detection import detect_equipment
+
+    torch.set_num_threads(config['threads'])
+    model = load_model(weights, config['backend'], imgsz=config['imgsz'], threads=config['threads'])
+    imgsz, batch = config['imgsz'], config['batch']
+    out_dir = Path(out_dir)
+    out_img = [out_dir / p.name for p in image_paths]
+    out_txt = [out_dir / p.with_suffix('.txt').name for p in image_paths]
+
+    # Each call is one timed unit: an image for single/scanner, a batch for batched
+    if config['path'] == 'single':
+        calls = [lambda i=i: predict_and_save(model, image_paths[i], out_img[i], out_txt[i], imgsz=imgsz)
+                 for i in range(len(image_paths))]
+        sizes = [1] * len(calls)
+    elif config['path'] == 'batched':
+        starts = range(0, len(image_paths), batch)
+        calls = [lambda s=s: predict_batch_and_save(model, image_paths[s:s + batch], out_img[s:s + batch],
+                                                    out_txt[s:s + batch], imgsz=imgsz, batch_size=batch)
+                 for s in starts]
+        sizes = [len(image_paths[s:s + batch]) for s in starts]
+    else:
+        frames = [cv2.imread(str(p)) for p in image_paths]
+        calls = [lambda f=f: detect_equipment(model, f, imgsz=imgsz) for f in frames]
+        sizes = [1] * len(calls)
+
+    for call in calls[:warmup]:
+        call()
+    latencies = []
+    start = time.perf_counter()
+    for call in calls:
+        call_start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    result_queue.put({
+        **config,
+        'key': config_key(config),
+        'images': sum(sizes),
+        'images_per_s': sum(sizes) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'peak_rss_mb': peak_rss_mb(),
+    })
+
+
+def run_benchmarks(configs, image_paths, weights, warmup=3):
+    """Benchmark every configuration, returns (runs, failed) where failed holds the configurations that crashed"""
+    ctx = mp.get_context('spawn')
+    runs = []
+    failed = []
+    for i, config in enumerate(configs, 1):
+        print(f"[{i}/{len(configs)}] {config_key(config)}")
+        result_queue = ctx.Queue()
+        # Rendered images and labels are only written to be timed, removed even when the process crashes
+        with tempfile.TemporaryDirectory(prefix='benchmark_') as out_dir:
+            process = ctx.Process(target=_run_config,
+                                  args=(config, image_paths, weights, warmup, out_dir, result_queue))
+            process.start()
+            process.join()
+        if process.exitcode != 0:
+            print(f"❌ {config_key(config)} failed (exit code {process.exitcode})")
+            failed.append({**config, 'key': config_key(config), 'exit_code': process.exitcode})
+            continue
+        run = result_queue.get()
+        print(f"   {run['images_per_s']:.1f} img/s  p50 {run['p50_ms']:.1f} ms  p95 {run['p95_ms']:.1f} ms  "
+              f"p99 {run['p99_ms']:.1f} ms  peak RSS {run['peak_rss_mb'] or 0:.0f} MB")
+        runs.append(run)
+    return runs, failed
+
+
+def find_regressions(runs, baseline_runs, max_regression=MAX_REGRESSION):
+    """(run, baseline run) pairs whose throughput fell more than max_regression below the baseline
+
+    Only configurations that ran are compared; baseline entries this run did
+    not request are ignored and crashed ones are reported through `failed`.
+    """
+    baseline = {reference['key']: reference for reference in baseline_runs}
+    regressions = []
+    for run in runs:
+        reference = baseline.get(run['key'])
+        if reference is not None and run['images_per_s'] < reference['images_per_s'] * (1 - max_regression):
+            regressions.append((run, reference))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Inference throughput and latency benchmark')
+    parser.add_argument('--weights', type=str, default='runs/detect/train/weights/best.pt', help='Weights to benchmark')
+    parser.add_argument('--paths', type=str, default=','.join(CODE_PATHS), help=f'Code paths out of {CODE_PATHS}')
+    parser.add_argument('--backends', type=str, default='torch', help='Comma separated inference backends')
+    parser.add_argument('--batch-sizes', type=_int_list, default=[1, 4, 8, 16], help='Batch sizes of the batched path')
+    parser.add_argument('--imgsz', type=_int_list, default=[640], help='Comma separated image sizes')
+    parser.add_argument('--threads', type=_int_list, default=[os.cpu_count() or 1], help='Comma separated thread counts')
+    parser.add_argument('--images', type=int, default=64, help='Number of test images per configuration')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed calls before measuring')
+    parser.add_argument('--output-dir', type=str, default='benchmarks', help='Directory of the versioned results')
+    parser.add_argument('--baseline', type=str, default='benchmarks/baseline.json', help='Baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--max-regression', type=float, default=MAX_REGRESSION,
+                        help='Fail when images/s drops more than this fraction below the baseline')
+    args = parser.parse_args()
+
+    this_dir = Path(__file__).parent
+    os.chdir(this_dir)
+    with open(this_dir / 'yolo_params.yaml', 'r') as file:
+        data = yaml.safe_load(file)
+    images_dir = Path(data['test']) / 'images'
+    image_paths = sorted(p for p in images_dir.glob('*') if p.suffix in ['.png', '.jpg'])[:args.images]
+    if not image_paths:
+        print(f"No test images found in {images_dir}")
+        exit(1)
+
+    configs = []
+    for path, backend, imgsz, threads in itertools.product(args.paths.split(','), args.backends.split(','),
+                                                           args.imgsz, args.threads):
+        for batch in (args.batch_sizes if path == 'batched' else [1]):
+            configs.append({'path': path, 'backend': backend, 'imgsz': imgsz, 'threads': threads, 'batch': batch})
+
+    runs, failed = run_benchmarks(configs, image_paths, args.weights, args.warmup)
+    results = {
+        'schema_version': SCHEMA_VERSION,
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'host': {'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count()},
+        'weights': args.weights,
+        'runs': runs,
+        'failed': failed,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = Path(args.output_dir) / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {output_path}")
+
+    if failed:
+        print(f"❌ {len(failed)} configuration(s) failed: {', '.join(run['key'] for run in failed)}")
+    if args.save_baseline:
+        if failed:
+            print("Baseline not saved, fix the failing configurations first")
+            exit(1)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('schema_version') != SCHEMA_VERSION:
+            print(f"Baseline schema {baseline.get('schema_version')} differs from {SCHEMA_VERSION}, skipping check")
+            exit(1 if failed else 0)
+        baseline_keys = {reference['key'] for reference in baseline['runs']}
+        unmatched = [run['key'] for run in runs if run['key'] not in baseline_keys]
+        if unmatched:
+            print(f"⚠️ No baseline for {', '.join(unmatched)}, not checked")
+        regressions = find_regressions(runs, baseline['runs'], args.max_regression)
+        for run, reference in regressions:
+            print(f"❌ Regression {run['key']}: {run['images_per_s']:.1f} img/s vs baseline "
+                  f"{reference['images_per_s']:.1f} img/s")
+        if regressions or failed:
+            exit(1)
+        print(f"✅ No throughput regression beyond {args.max_regression*100:.0f}% against {args.baseline}")
+    if failed:
+        exit(1)
@@ -0,0 +1,55 @@
+import logging
+import re
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+_TAGS = re.compile(r'<[^>]+>')
+
+
+class AlertLog:
+    """Fixed capacity alert history that the UI drains at its own pace
+
+    Alerts go into a ring of the last `capacity` entries and into a rotating
+    log file (max_bytes per file, backup_count old files), so memory stays flat
+    however long the scanner runs while every alert is still on disk. New
+    entries are queued until the UI calls drain(), which lets the view be
+    refreshed on a timer instead of once per alert.
+    """
+
+    def __init__(self, capacity=500, path=None, max_bytes=1_000_000, backup_count=5):
+        self.capacity = capacity
+        self.entries = deque(maxlen=capacity)
+        self.new_entries = deque(maxlen=capacity)
+        self.total = 0
+        self.lock = threading.Lock()
+        self.logger = None
+        if path:
+            self.logger = logging.getLogger(f"space_scanner.alerts.{id(self)}")
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+            self.logger.addHandler(handler)
+
+    def append(self, html, level='INFO'):
+        """Record one alert given as the HTML shown in the view"""
+        with self.lock:
+            self.entries.append(html)
+            self.new_entries.append(html)
+            self.total += 1
+        if self.logger:
+            self.logger.log(getattr(logging, level, logging.INFO), _TAGS.sub('', html))
+
+    def drain(self):
+        """Alerts added since the last drain, at most `capacity` of them"""
+        with self.lock:
+            entries = list(self.new_entries)
+            self.new_entries.clear()
+        return entries
+
+    def close(self):
+        if self.logger:
+            for handler in list(self.logger.handlers):
+                handler.close()
+                self.logger.removeHandler(handler)
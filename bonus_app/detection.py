@@ -0,0 +1,70 @@
+import numpy as np
+
+# Equipment class names (order must match training)
+CLASS_NAMES = ["FireExtinguisher", "ToolBox", "OxygenTank"]
+
+
+def detect_equipment(model, frame, conf_threshold=0.5, imgsz=None):
+    """Detect equipment in a BGR frame, returns a list of detection dicts
+
+    Kept free of Qt so the scanner, benchmarks and headless tools share the
+    exact same detection logic.
+    """
+    return detect_equipment_batch(model, [frame], conf_threshold, imgsz)[0]
+
+
+def detect_equipment_batch(model, frames, conf_threshold=0.5, imgsz=None):
+    """Detect equipment in several BGR frames with one batched forward pass, one detection list per frame"""
+    # Ultralytics treats numpy input as BGR, exactly what OpenCV produces, so no conversion here
+    kwargs = {'imgsz': imgsz} if imgsz else {}
+    results = model(list(frames), conf=conf_threshold, verbose=False, **kwargs)
+    return [_result_to_detections(result, conf_threshold) for result in results]
+
+
+def _result_to_detections(result, conf_threshold):
+    detections = []
+    boxes = result.boxes
+    if boxes is not None:
+        for box in boxes:
+            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+            conf = box.conf[0].cpu().numpy()
+            cls = int(box.cls[0].cpu().numpy())
+            if conf >= conf_threshold and 0 <= cls < len(CLASS_NAMES):
+                detections.append({
+                    'bbox': [int(x1), int(y1), int(x2), int(y2)],
+                    'confidence': float(conf),
+                    'class': CLASS_NAMES[cls],
+                    'class_id': cls
+                })
+    return detections
+
+
+def warm_up(model, sizes, conf_threshold=0.5):
+    """Run the detector once per input size so the first real frame at each size is not slow"""
+    blank = np.zeros((480, 640, 3), dtype=np.uint8)
+    for imgsz in sizes:
+        detect_equipment(model, blank, conf_threshold, imgsz)
+
+
+def _box_iou(box1, box2):
+    ix1, iy1 = max(box1[0], box2[0]), max(box1[1], box2[1])
+    ix2, iy2 = min(box1[2], box2[2]), min(box1[3], box2[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
+    area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
+    return inter / (area1 + area2 - inter + 1e-9)
+
+
+def detection_agreement(reference, detections, iou_threshold=0.5):
+    """F1 style agreement of two detection lists: same class pairs with IoU >= iou_threshold, 1.0 when both are empty"""
+    if not reference and not detections:
+        return 1.0
+    unmatched = list(detections)
+    matched = 0
+    for ref in sorted(reference, key=lambda d: -d['confidence']):
+        candidates = [d for d in unmatched if d['class_id'] == ref['class_id']]
+        best = max(candidates, key=lambda d: _box_iou(ref['bbox'], d['bbox']), default=None)
+        if best is not None and _box_iou(ref['bbox'], best['bbox']) >= iou_threshold:
+            unmatched.remove(best)
+            matched += 1
+    return 2 * matched / (len(reference) + len(detections))
@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import cv2
+import numpy as np
+
+# Shared project modules live one level up
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import inference_backend
+from detection import detect_equipment_batch, warm_up
+
+
+class DynamicBatcher(threading.Thread):
+    """Groups concurrent detection requests into batched forward passes
+
+    The first queued request opens a batch that closes once max_batch requests
+    are in or max_wait_ms after that first request arrived, whichever comes
+    first, so a lone request waits at most max_wait_ms for company. Requests
+    that queued up while the previous batch ran are always taken along. The
+    batch runs at the lowest requested confidence and each caller gets its own
+    detections filtered at its confidence, in detect_equipment's format.
+    """
+
+    def __init__(self, model, imgsz=640, max_batch=8, max_wait_ms=10):
+        super().__init__(daemon=True)
+        self.model = model
+        self.imgsz = imgsz
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.running = False
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.images = 0
+        self.latencies_ms = deque(maxlen=1000)
+
+    def submit(self, frame, conf_threshold=0.5):
+        """Queue one BGR frame, the returned Future resolves to its detection list"""
+        future = Future()
+        self.requests.put((frame, conf_threshold, time.perf_counter(), future))
+        return future
+
+    def _collect(self):
+        try:
+            first = self.requests.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Requests that queued up while the previous batch ran join without waiting
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        self.running = True
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+            frames = [frame for frame, _, _, _ in batch]
+            try:
+                results = detect_equipment_batch(self.model, frames, min(conf for _, conf, _, _ in batch), self.imgsz)
+            except Exception as e:
+                for _, _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            now = time.perf_counter()
+            with self.lock:
+                self.batches += 1
+                self.images += len(batch)
+                for _, _, submitted, _ in batch:
+                    self.latencies_ms.append((now - submitted) * 1000)
+            for (_, conf, _, future), detections in zip(batch, results):
+                future.set_result([det for det in detections if det['confidence'] >= conf])
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join()
+
+    def stats(self):
+        with self.lock:
+            latencies = list(self.latencies_ms)
+            stats = {
+                'batches': self.batches,
+                'images': self.images,
+                'mean_batch_size': self.images / self.batches if self.batches else 0.0,
+            }
+        if latencies:
+            stats['p50_ms'] = float(np.percentile(latencies, 50))
+            stats['p95_ms'] = float(np.percentile(latencies, 95))
+        return stats
+
+
+class DetectionHandler(BaseHTTPRequestHandler):
+    """POST /detect with an encoded image body (?conf=0.5), GET /health and GET /stats"""
+
+    # Set on the server class by serve()
+    batcher = None
+    backend = None
+    protocol_version = 'HTTP/1.1'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._send_json(200, {'status': 'ok', 'backend': self.backend})
+        elif path == '/stats':
+            self._send_json(200, self.batcher.stats())
+        else:
+            self._send_json(404, {'error': f'Unknown path {path}'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/detect':
+            self._send_json(404, {'error': f'Unknown path {url.path}'})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        try:
+            conf = float(parse_qs(url.query).get('conf', ['0.5'])[0])
+        except ValueError:
+            self._send_json(400, {'error': 'conf must be a number'})
+            return
+        frame = cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR) if body else None
+        if frame is None:
+            self._send_json(400, {'error': 'Request body is not a decodable image'})
+            return
+        start = time.perf_counter()
+        try:
+            detections = self.batcher.submit(frame, conf).result()
+        except Exception as e:
+            self._send_json(500, {'error': f'Detection failed: {str(e)}'})
+            return
+        self._send_json(200, {'detections': detections, 'latency_ms': (time.perf_counter() - start) * 1000})
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        # BaseHTTPRequestHandler reads these for its environment
+        self.server_name, self.server_port = 'localhost', 0
+
+
+def serve(model, backend='torch', host='127.0.0.1', port=8080, unix_socket=None, imgsz=640, max_batch=8,
+          max_wait_ms=10, verbose=False):
+    """Run the detection service until interrupted"""
+    batcher = DynamicBatcher(model, imgsz, max_batch, max_wait_ms)
+    batcher.start()
+    handler = type('Handler', (DetectionHandler,), {'batcher': batcher, 'backend': backend})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, handler)
+        address = f"unix:{unix_socket}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        address = f"http://{host}:{port}"
+    server.verbose = verbose
+    print(f"Detection service listening on {address} (max batch {max_batch}, max wait {max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        print(f"Served {json.dumps(batcher.stats())}")
+
+
+def main():
+    this_dir = os.path.dirname(os.path.abspath(__file__))
+    default_weights = os.path.join(os.path.dirname(this_dir), "runs", "detect", "train", "weights", "best.pt")
+    parser = argparse.ArgumentParser(description='Headless equipment detection service')
+    # Model
+    parser.add_argument('--weights', type=str, default=default_weights, help='Model weights')
+    parser.add_argument('--backend', type=str, default='torch', choices=inference_backend.BACKENDS,
+                        help='Inference backend, onnx/openvino are exported once and cached next to the weights')
+    parser.add_argument('--imgsz', type=int, default=640, help='Inference image size')
+    parser.add_argument('--threads', type=int, default=None, help='Inference threads (default: all cores)')
+    # Listening address, a Unix socket replaces host/port
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='HTTP host')
+    parser.add_argument('--port', type=int, default=8080, help='HTTP port')
+    parser.add_argument('--unix-socket', type=str, default=None, help='Serve on this Unix socket path instead')
+    # Dynamic batching
+    parser.add_argument('--max-batch', type=int, default=8, help='Most requests per batched call')
+    parser.add_argument('--max-wait-ms', type=float, default=10, help='Longest a request waits for a batch to fill')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.weights):
+        print(f"Model file not found: {args.weights}")
+        exit(1)
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+    model = inference_backend.load_model(args.weights, args.backend, imgsz=args.imgsz, threads=args.threads)
+    warm_up(model, [args.imgsz])
+    serve(model, args.backend, args.host, args.port, args.unix_socket, args.imgsz, args.max_batch, args.max_wait_ms,
+          args.verbose)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+import cv2
+import numpy as np
+
+
+def parse_source(source):
+    """OpenCV source from a CLI string: a device index, a video file or a stream URL"""
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+class FrameCapture(threading.Thread):
+    """Reads an OpenCV source on its own thread into a ring of preallocated frame buffers
+
+    Each frame is decoded straight into the oldest ring slot (or copied there
+    when the backend returns its own arrays) together with its capture
+    timestamp (time.monotonic), so consumers can measure glass-to-glass
+    latency. latest() returns a view of the newest slot; it stays valid until
+    the reader wraps around the ring, so consumers that keep a frame longer
+    than a few frame periods must copy it.
+    """
+
+    def __init__(self, source=0, ring_size=4):
+        super().__init__(daemon=True)
+        self.source = parse_source(source)
+        self.ring_size = ring_size
+        self.capture = cv2.VideoCapture(self.source)
+        # Keep the driver queue short so stale frames do not pile up behind us
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        # Files are paced at their own frame rate instead of being read as fast as possible
+        self.is_file = isinstance(self.source, str) and os.path.exists(self.source)
+        fps = self.capture.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.ring = None
+        # Cleared once the backend is seen returning its own arrays instead of filling the slot
+        self.decodes_in_place = True
+        self.timestamps = np.zeros(ring_size)
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.running = False
+        self.error = None
+
+    def is_opened(self):
+        return self.capture.isOpened()
+
+    def _allocate(self, shape, dtype):
+        self.ring = np.empty((self.ring_size,) + tuple(shape), dtype=dtype)
+
+    def run(self):
+        self.running = True
+        next_due = time.monotonic()
+        while self.running:
+            if not self.capture.grab():
+                self.error = "Stream ended" if self.is_file else "Failed to read frame"
+                break
+            timestamp = time.monotonic()
+            slot = self.seq % self.ring_size
+            target = self.ring[slot] if self.ring is not None else None
+            ok, frame = self.capture.retrieve(target)
+            if not ok or frame is None:
+                self.error = "Failed to decode frame"
+                break
+            if self.ring is None or frame.shape != self.ring.shape[1:] or frame.dtype != self.ring.dtype:
+                # First frame or the source changed resolution: (re)allocate the ring once
+                with self.lock:
+                    self._allocate(frame.shape, frame.dtype)
+                    self.ring[slot] = frame
+            elif not np.shares_memory(frame, self.ring[slot]):
+                # The backend decoded into a new array, copy it into the slot instead of growing the ring
+                if self.decodes_in_place:
+                    self.decodes_in_place = False
+                    print(f"Capture backend of {self.source} does not decode in place, copying frames into the ring")
+                np.copyto(self.ring[slot], frame)
+            with self.lock:
+                self.timestamps[slot] = timestamp
+                self.seq += 1
+            if self.frame_interval:
+                next_due += self.frame_interval
+                time.sleep(max(0.0, next_due - time.monotonic()))
+        self.running = False
+
+    def latest(self):
+        """(sequence number, capture timestamp, frame view) of the newest frame, frame is None before the first"""
+        with self.lock:
+            if self.seq == 0:
+                return 0, 0.0, None
+            slot = (self.seq - 1) % self.ring_size
+            return self.seq, float(self.timestamps[slot]), self.ring[slot]
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join()
+        self.capture.release()
@@ -0,0 +1,55 @@
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap scene change test that decides whether a frame needs the detector
+
+    Frames are shrunk to a small grayscale thumbnail and compared with the
+    thumbnail of the last frame that was sent to the detector, so slow drift
+    still adds up to a refresh. A frame counts as changed when more than
+    changed_fraction of its pixels differ by more than pixel_threshold gray
+    levels. Even a static scene is refreshed every min_refresh_s seconds. All
+    buffers are preallocated, the test costs one resize, one conversion and one
+    difference on a thumbnail.
+    """
+
+    def __init__(self, pixel_threshold=25, changed_fraction=0.01, min_refresh_s=2.0, size=(64, 48)):
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.min_refresh_s = min_refresh_s
+        self.size = size
+        self.small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.gray = np.empty((size[1], size[0]), dtype=np.uint8)
+        self.reference = np.empty_like(self.gray)
+        self.diff = np.empty_like(self.gray)
+        self.has_reference = False
+        self.last_refresh = 0.0
+        self.frames = 0
+        self.hits = 0
+
+    def force(self):
+        """Make the next frame go to the detector, e.g. after the detection settings changed"""
+        self.has_reference = False
+
+    def should_detect(self, frame, now=None):
+        """True when the frame has to go to the detector, False when the last detections still apply"""
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        if self.has_reference and now - self.last_refresh < self.min_refresh_s:
+            cv2.absdiff(self.gray, self.reference, dst=self.diff)
+            cv2.threshold(self.diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self.diff)
+            if cv2.countNonZero(self.diff) <= self.changed_fraction * self.diff.size:
+                self.hits += 1
+                return False
+        self.gray, self.reference = self.reference, self.gray
+        self.has_reference = True
+        self.last_refresh = now
+        return True
+
+    def hit_rate(self):
+        """Fraction of frames that skipped the detector"""
+        return self.hits / self.frames if self.frames else 0.0
@@ -0,0 +1,62 @@
+# Detector input sizes the scanner can switch between, all multiples of the model stride (32)
+DEFAULT_LADDER = (320, 416, 512, 640)
+
+
+class ResolutionController:
+    """Picks the detector input size from a ladder so inference stays within a latency budget
+
+    Detector latency is tracked per size as a moving average. The controller
+    steps down as soon as the current size runs over the target and steps up
+    only when the next size is expected (scaling by pixel count) to stay below
+    target * (1 - hysteresis) after holding the current size for min_dwell
+    frames, so it does not oscillate between two neighbouring sizes. Without a
+    target it stays at the largest size.
+    """
+
+    def __init__(self, ladder=DEFAULT_LADDER, target_ms=None, hysteresis=0.2, min_dwell=10, min_samples=3,
+                 alpha=0.2):
+        self.ladder = sorted(ladder)
+        self.target_ms = target_ms
+        self.hysteresis = hysteresis
+        self.min_dwell = min_dwell
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.index = len(self.ladder) - 1
+        self.latency_ms = {}
+        self.frames_at_size = 0
+        self.switches = 0
+
+    @property
+    def imgsz(self):
+        return self.ladder[self.index]
+
+    def set_target(self, target_ms):
+        """Change the latency budget, None or 0 goes back to the largest size"""
+        self.target_ms = target_ms or None
+        if self.target_ms is None:
+            self._switch(len(self.ladder) - 1)
+
+    def _switch(self, index):
+        if index != self.index:
+            self.index = index
+            self.switches += 1
+        self.frames_at_size = 0
+
+    def record(self, latency_ms):
+        """Add one detector latency measured at the current size, returns the size to use next"""
+        size = self.imgsz
+        average = self.latency_ms.get(size)
+        average = latency_ms if average is None else average + self.alpha * (latency_ms - average)
+        self.latency_ms[size] = average
+        self.frames_at_size += 1
+        if self.target_ms is None:
+            return size
+
+        if average > self.target_ms and self.index > 0 and self.frames_at_size >= self.min_samples:
+            self._switch(self.index - 1)
+        elif self.index < len(self.ladder) - 1 and self.frames_at_size >= self.min_dwell:
+            bigger = self.ladder[self.index + 1]
+            expected = average * (bigger / size) ** 2
+            if expected < self.target_ms * (1 - self.hysteresis):
+                self._switch(self.index + 1)
+        return self.imgsz
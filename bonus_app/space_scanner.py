@@ -1,87 +1,484 @@
 import sys
+import argparse
 import cv2
 import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QFileDialog, 
-                             QTextEdit, QGroupBox, QGridLayout, QSlider)
+                             QTextEdit, QGroupBox, QGridLayout, QSlider, QSpinBox)
 from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QImage, QPixmap, QFont, QPalette, QColor
-from ultralytics import YOLO
+from PyQt5.QtGui import QImage, QPainter, QFont, QPalette, QColor
 import os
 import json
+import threading
+import time
+from collections import deque
 from datetime import datetime
 
-# Equipment class names (order must match training)
-CLASS_NAMES = ["FireExtinguisher", "ToolBox", "OxygenTank"]
+# Shared project modules live one level up
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import inference_backend
+from detection import CLASS_NAMES, detect_equipment, detect_equipment_batch, detection_agreement, warm_up
+from frame_capture import FrameCapture
+from tracker import ByteTracker
+from resolution_controller import DEFAULT_LADDER, ResolutionController
+from motion_gate import MotionGate
+from alert_log import AlertLog
+
+class StreamSlot:
+    """Per camera state of the inference worker: double buffer, scheduling and counters"""
+
+    def __init__(self, weight=1.0, max_fps=None, tracker=None):
+        self.weight = weight
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.tracker = tracker
+        self.pending = None
+        self.active = None
+        self.has_pending = False
+        self.pending_timestamp = 0.0
+        self.last_inferred = None
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.fps = None
+        # Bumped when the stream is cleared; results of frames taken in an older generation are stale
+        self.generation = 0
+        self.active_generation = 0
+
+    def due(self, now):
+        """Whether the stream's FPS cap allows another inference"""
+        return self.last_inferred is None or now - self.last_inferred >= self.min_interval
+
+    def served(self):
+        """Inferred frames relative to the stream's share, the least served stream goes first"""
+        return self.frames_processed / self.weight
+
 
 class DetectionThread(QThread):
-    """Thread for running YOLOv8 detection"""
-    detection_signal = pyqtSignal(list, np.ndarray)
+    """Thread for running YOLOv8 detection for one or more camera streams
+
+    Frames are published per stream with update_frame and the worker always
+    runs on each stream's newest one; a frame replaced before the worker picked
+    it up is dropped. Published frames are copied into two preallocated buffers
+    per stream (pending and active) that are swapped when the worker takes a
+    frame, so capture ring slots can be reused immediately. Results come back
+    through detection_signal with the stream index, the frame's capture
+    timestamp and the stream generation it was taken in, so the GUI never
+    waits on inference and can drop results of a stream cleared since.
+
+    With several streams, one model serves all of them: the worker collects the
+    newest frame of every stream that has one (waiting at most batch_wait_ms
+    for streams that are about to deliver) and runs them as one batched forward
+    pass. Streams can be capped to max_fps inferences per second, and when more
+    streams are ready than max_batch the ones with the fewest inferred frames
+    relative to their weight go first.
+
+    With keyframe_interval > 1 the detector only runs on keyframes (every N
+    frames, or sooner when track confidence drops below refresh_conf) and a
+    ByteTracker per stream carries the boxes forward with stable ids in between.
+
+    The detector input size comes from a ResolutionController fed with the
+    measured latency of each batched call. Every size on its ladder is warmed up
+    before the first frame so switching sizes later does not stall.
+
+    swap_model replaces the model between two batches without stopping the
+    worker and keeps the previous one for rollback. About once a second the
+    worker keeps a copy of a keyframe with the detector's raw output on it and
+    the input size it ran at, as reference frames for checking a new model
+    before it is swapped in.
+    """
+    detection_signal = pyqtSignal(int, list, float, int)
     alert_signal = pyqtSignal(str, str)
     
-    def __init__(self, model_path):
+    def __init__(self, model_path, backend='torch', keyframe_interval=1, refresh_conf=0.35,
+                 ladder=DEFAULT_LADDER, target_latency_ms=None, streams=1, stream_weights=None, max_fps=None,
+                 max_batch=None, batch_wait_ms=10):
         super().__init__()
-        self.model = YOLO(model_path)
+        self.model = inference_backend.load_model(model_path, backend, imgsz=max(ladder))
+        self.resolution = ResolutionController(ladder, target_latency_ms)
+        self.previous_model = None
+        self.reference_frames = deque(maxlen=5)
+        self.last_reference = 0.0
+        self.fps = None
+        self.keyframe_interval = keyframe_interval
+        self.refresh_conf = refresh_conf
+        weights = stream_weights or [1.0] * streams
+        fps_caps = max_fps or [None] * streams
+        self.streams = [StreamSlot(weights[i], fps_caps[i], ByteTracker() if keyframe_interval > 1 else None)
+                        for i in range(streams)]
+        self.max_batch = max_batch or streams
+        self.batch_wait = batch_wait_ms / 1000
         self.running = False
-        self.frame = None
-        
+        self.conf_threshold = 0.5
+        self.frame_ready = threading.Condition()
+
+    @property
+    def frames_processed(self):
+        return sum(slot.frames_processed for slot in self.streams)
+
+    @property
+    def frames_dropped(self):
+        return sum(slot.frames_dropped for slot in self.streams)
+
     def run(self):
         self.running = True
+        try:
+            warm_up(self.model, self.resolution.ladder, self.conf_threshold)
+        except Exception as e:
+            self.alert_signal.emit("WARNING", f"Warm-up failed: {str(e)}")
+        last_done = None
         while self.running:
-            if self.frame is not None:
-                results = self.model(self.frame, conf=0.5)
-                detections = []
-                
-                for result in results:
-                    boxes = result.boxes
-                    if boxes is not None:
-                        for box in boxes:
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            conf = box.conf[0].cpu().numpy()
-                            cls = int(box.cls[0].cpu().numpy())
-                            class_name = result.names[cls]
-                            
-                            detections.append({
-                                'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                                'confidence': float(conf),
-                                'class': class_name,
-                                'class_id': cls
-                            })
-                
-                self.detection_signal.emit(detections, self.frame.copy())
-            
-            self.msleep(100)  # 10 FPS
-    
+            batch = self.next_batch()
+            if not batch:
+                break
+            try:
+                results = self.detect(batch)
+            except Exception as e:
+                self.alert_signal.emit("ERROR", f"Detection failed: {str(e)}")
+                continue
+            now = time.perf_counter()
+            if last_done is not None:
+                fps = len(batch) / max(now - last_done, 1e-6)
+                self.fps = fps if self.fps is None else self.fps + 0.1 * (fps - self.fps)
+            last_done = now
+            # Frames stay behind: the active buffer is reused by the next update_frame
+            for (index, _, timestamp), detections in zip(batch, results):
+                slot = self.streams[index]
+                slot.frames_processed += 1
+                self.detection_signal.emit(index, detections, timestamp, slot.active_generation)
+
+    def next_batch(self):
+        """Wait for frames and take the next batch as (stream, frame, timestamp), empty once stopped"""
+        with self.frame_ready:
+            deadline = None
+            while self.running:
+                now = time.monotonic()
+                ready = [i for i, slot in enumerate(self.streams) if slot.has_pending and slot.due(now)]
+                # Streams that delivered before and may deliver again within the wait
+                waiting = [slot for slot in self.streams
+                           if slot.pending is not None and not slot.has_pending and slot.due(now)]
+                if ready and deadline is None:
+                    deadline = now + self.batch_wait
+                if ready and (not waiting or len(ready) >= self.max_batch or now >= deadline):
+                    break
+                timeout = 0.1 if deadline is None else max(deadline - now, 0.0005)
+                # Wake up when a capped stream becomes due again
+                for slot in self.streams:
+                    if slot.has_pending and not slot.due(now):
+                        timeout = min(timeout, slot.last_inferred + slot.min_interval - now)
+                self.frame_ready.wait(max(timeout, 0.0005))
+            if not self.running:
+                return []
+            ready.sort(key=lambda i: self.streams[i].served())
+            batch = []
+            for i in ready[:self.max_batch]:
+                slot = self.streams[i]
+                if slot.active_generation != slot.generation:
+                    # First frame since the stream was cleared, tracks of the old feed do not carry over.
+                    # Trackers are only touched here on the worker thread, never by clear_stream
+                    if slot.tracker is not None:
+                        slot.tracker = ByteTracker()
+                    slot.active_generation = slot.generation
+                slot.pending, slot.active = slot.active, slot.pending
+                slot.has_pending = False
+                if slot.last_inferred is not None:
+                    fps = 1.0 / max(now - slot.last_inferred, 1e-6)
+                    slot.fps = fps if slot.fps is None else slot.fps + 0.1 * (fps - slot.fps)
+                slot.last_inferred = now
+                batch.append((i, slot.active, slot.pending_timestamp))
+            return batch
+
+    def detect(self, batch):
+        """Detections per batch entry, from one batched detector call or from the trackers between keyframes"""
+        keyframes = [entry for entry in batch if self.streams[entry[0]].tracker is None
+                     or self.streams[entry[0]].tracker.needs_keyframe(self.keyframe_interval, self.refresh_conf)]
+        conf_threshold = self.conf_threshold
+        if self.keyframe_interval > 1:
+            # Low confidence boxes are kept for the tracker's second association stage
+            conf_threshold = min(self.streams[0].tracker.low_thresh, self.conf_threshold)
+        imgsz = self.resolution.imgsz
+        raw = self.run_detector([frame for _, frame, _ in keyframes], conf_threshold) if keyframes else []
+        raw = {index: detections for (index, _, _), detections in zip(keyframes, raw)}
+        if keyframes and time.perf_counter() - self.last_reference >= 1.0:
+            # The detector's own output, before any tracking, at the size it ran at
+            index, frame, _ = keyframes[0]
+            detections = [det for det in raw[index] if det['confidence'] >= self.conf_threshold]
+            with self.frame_ready:
+                self.reference_frames.append((frame.copy(), detections, imgsz, self.conf_threshold))
+            self.last_reference = time.perf_counter()
+
+        results = []
+        for index, _, _ in batch:
+            tracker = self.streams[index].tracker
+            if tracker is None:
+                results.append(raw[index])
+                continue
+            if index in raw:
+                tracker.high_thresh = self.conf_threshold
+                tracker.update(raw[index])
+            else:
+                tracker.predict()
+            results.append(tracker.detections())
+        return results
+
+    def run_detector(self, frames, conf_threshold):
+        """detect_equipment_batch at the controller's current size, feeding its latency back to the controller"""
+        start = time.perf_counter()
+        detections = detect_equipment_batch(self.model, frames, conf_threshold, self.resolution.imgsz)
+        self.resolution.record((time.perf_counter() - start) * 1000)
+        return detections
+
+    def swap_model(self, model):
+        """Switch to another model between two batches, the batch in flight finishes on the old one"""
+        with self.frame_ready:
+            self.previous_model, self.model = self.model, model
+            # Latency history belongs to the old model
+            self.resolution.latency_ms.clear()
+
+    def reference_snapshot(self):
+        """Copy of the current reference frames as (frame, detections, imgsz, conf_threshold)"""
+        with self.frame_ready:
+            return list(self.reference_frames)
+
+    def rollback(self):
+        """Go back to the model that was replaced by the last swap"""
+        if self.previous_model is None:
+            return False
+        self.swap_model(self.previous_model)
+        return True
+
     def stop(self):
         self.running = False
+        with self.frame_ready:
+            self.frame_ready.notify_all()
     
-    def update_frame(self, frame):
-        self.frame = frame
+    def clear_stream(self, stream):
+        """Forget a stopped stream's frames so batches stop waiting for it, its buffers are reallocated on restart
+
+        The worker resets the stream's tracker when it takes its next frame, and
+        results of a batch in flight carry the old generation so they can be dropped.
+        """
+        slot = self.streams[stream]
+        with self.frame_ready:
+            slot.generation += 1
+            slot.pending = slot.active = None
+            slot.has_pending = False
+            slot.last_inferred = None
+            slot.fps = None
+            self.frame_ready.notify()
+
+    def update_frame(self, frame, timestamp=0.0, stream=0):
+        """Publish a stream's newest frame, replacing any frame of that stream still waiting for the worker"""
+        slot = self.streams[stream]
+        with self.frame_ready:
+            if slot.pending is None or slot.pending.shape != frame.shape:
+                slot.pending = np.empty_like(frame)
+                slot.active = np.empty_like(frame)
+            if slot.has_pending:
+                slot.frames_dropped += 1
+            np.copyto(slot.pending, frame)
+            slot.pending_timestamp = timestamp
+            slot.has_pending = True
+            self.frame_ready.notify()
+
+class ModelLoaderThread(QThread):
+    """Loads and warms up new weights off the GUI thread for a hot swap
+
+    With min_agreement > 0 the new model must also reproduce the running
+    model's detections on the worker's reference frames, each at the input
+    size and confidence it was recorded at (mean F1 style agreement, see
+    detection_agreement), before it is offered for the swap. Without reference
+    frames the swap is refused.
+    """
+    loaded_signal = pyqtSignal(object, str)
+    alert_signal = pyqtSignal(str, str)
+
+    def __init__(self, model_path, backend, ladder, conf_threshold=0.5, reference_frames=(), min_agreement=0.0):
+        super().__init__()
+        self.model_path = model_path
+        self.backend = backend
+        self.ladder = ladder
+        self.conf_threshold = conf_threshold
+        self.reference_frames = list(reference_frames)
+        self.min_agreement = min_agreement
+
+    def run(self):
+        try:
+            start = time.perf_counter()
+            model = inference_backend.load_model(self.model_path, self.backend, imgsz=max(self.ladder))
+            warm_up(model, self.ladder, self.conf_threshold)
+            summary = f"loaded and warmed up in {time.perf_counter() - start:.1f} s"
+            if self.min_agreement > 0:
+                if not self.reference_frames:
+                    self.alert_signal.emit("ERROR", "New model rejected: no reference frames to check it against "
+                                                    "yet, run detection for a few seconds and reload again")
+                    return
+                agreement = np.mean([
+                    detection_agreement(reference, detect_equipment(model, frame, conf_threshold, imgsz))
+                    for frame, reference, imgsz, conf_threshold in self.reference_frames])
+                if agreement < self.min_agreement:
+                    self.alert_signal.emit("ERROR", f"New model rejected: agreement {agreement:.2f} on "
+                                                    f"{len(self.reference_frames)} reference frames is below "
+                                                    f"{self.min_agreement:.2f}")
+                    return
+                summary += f", agreement {agreement:.2f} on {len(self.reference_frames)} reference frames"
+            self.loaded_signal.emit(model, summary)
+        except Exception as e:
+            self.alert_signal.emit("ERROR", f"Failed to load new model: {str(e)}")
+
+
+class VideoLabel(QLabel):
+    """QLabel that paints frames from a persistent display buffer
+
+    Each frame is scaled once, straight into a preallocated BGR buffer the size
+    of the label, annotated there and painted through a QImage that wraps the
+    same memory (Format_BGR888, or one conversion into a second preallocated
+    buffer on Qt < 5.14). Nothing is allocated per frame until the label or
+    the frame size changes.
+    """
+
+    def __init__(self, text=""):
+        super().__init__(text)
+        self.buffer = None
+        self.rgb = None
+        self.image = None
+        self.showing_frame = False
+        self.frame = None
+        self.detections = []
+        self.prepare_ms = None
+        self.paint_ms = None
+
+    def _allocate(self, width, height):
+        self.buffer = np.empty((height, width, 3), dtype=np.uint8)
+        if hasattr(QImage, 'Format_BGR888'):
+            self.rgb = None
+            self.image = QImage(self.buffer.data, width, height, 3 * width, QImage.Format_BGR888)
+        else:
+            self.rgb = np.empty_like(self.buffer)
+            self.image = QImage(self.rgb.data, width, height, 3 * width, QImage.Format_RGB888)
+
+    def show_frame(self, frame, detections, keep=True):
+        """Scale, annotate and schedule a repaint of a BGR frame, the frame itself is not modified
+
+        With keep the frame is held on to and redrawn at the new size on resize.
+        Capture ring views are not kept, the reader overwrites them and the next
+        camera tick redraws anyway.
+        """
+        start = time.perf_counter()
+        h, w = frame.shape[:2]
+        scale = min(self.width() / w, self.height() / h)
+        width, height = max(1, int(w * scale)), max(1, int(h * scale))
+        if self.buffer is None or self.buffer.shape[:2] != (height, width):
+            self._allocate(width, height)
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        cv2.resize(frame, (width, height), dst=self.buffer, interpolation=interpolation)
+        for det in detections:
+            x1, y1, x2, y2 = (int(v * scale) for v in det['bbox'])
+            label = f"{det['class']} {det['confidence']*100:.1f}%"
+            if 'track_id' in det:
+                label = f"#{det['track_id']} {label}"
+            color = (0, 255, 0)
+            cv2.rectangle(self.buffer, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(self.buffer, label, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+        if self.rgb is not None:
+            cv2.cvtColor(self.buffer, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        if not self.showing_frame:
+            self.clear()
+            self.showing_frame = True
+        # Kept to redraw at the new size on resize
+        self.frame, self.detections = (frame, detections) if keep else (None, [])
+        self.prepare_ms = self._average(self.prepare_ms, (time.perf_counter() - start) * 1000)
+        self.update()
+
+    def show_text(self, text):
+        self.showing_frame = False
+        self.frame = None
+        self.setText(text)
+
+    def display_ms(self):
+        """Smoothed per-frame display cost: scaling and drawing plus painting"""
+        if self.prepare_ms is None or self.paint_ms is None:
+            return None
+        return self.prepare_ms + self.paint_ms
+
+    @staticmethod
+    def _average(current, sample, alpha=0.1):
+        return sample if current is None else current + alpha * (sample - current)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.showing_frame or self.image is None:
+            return
+        start = time.perf_counter()
+        painter = QPainter(self)
+        painter.drawImage((self.width() - self.image.width()) // 2,
+                          (self.height() - self.image.height()) // 2, self.image)
+        painter.end()
+        self.paint_ms = self._average(self.paint_ms, (time.perf_counter() - start) * 1000)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.showing_frame and self.frame is not None:
+            self.show_frame(self.frame, self.detections)
+
 
 class SpaceStationScanner(QMainWindow):
-    """Main application window for Space Station Object Detection"""
+    """Main application window for Space Station Object Detection
+
+    Every source gets its own capture thread, video view and status panel,
+    while a single DetectionThread batches the newest frames of all of them.
+    """
     
-    def __init__(self):
+    def __init__(self, backend='torch', sources=(0,), keyframe_interval=1, ladder=DEFAULT_LADDER,
+                 target_latency_ms=0, motion_gate=False, min_refresh_s=2.0, swap_min_agreement=0.0,
+                 stream_weights=None, stream_fps=None, max_batch=None, batch_wait_ms=10,
+                 alert_capacity=500, alert_file=None, ui_refresh_ms=250):
         super().__init__()
+        # Alerts are buffered and shown by refresh_ui, at most ui_refresh_ms apart
+        self.alert_log = AlertLog(alert_capacity, alert_file)
+        self.ui_dirty = False
+        self.shown_status = [{} for _ in sources]
+        self.shown_info = None
+        self.swap_min_agreement = swap_min_agreement
+        self.model_loader = None
+        self.backend = backend
+        self.sources = list(sources)
+        self.keyframe_interval = keyframe_interval
+        self.ladder = ladder
+        self.target_latency_ms = target_latency_ms
+        self.stream_weights = stream_weights
+        self.stream_fps = stream_fps
+        self.max_batch = max_batch
+        self.batch_wait_ms = batch_wait_ms
+        streams = range(len(self.sources))
+        # Static scenes reuse the last detections instead of going to the worker
+        self.motion_gates = [MotionGate(min_refresh_s=min_refresh_s) if motion_gate else None for _ in streams]
         # Get the absolute path to the original model file
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(current_dir)
         self.model_path = os.path.join(project_root, "runs", "detect", "train", "weights", "best.pt")
         self.conf_threshold = 0.5
         self.detection_thread = None
-        self.camera = None
+        self.last_detections = [[] for _ in streams]
+        self.cameras = [None for _ in streams]
+        self.current_frames = [None for _ in streams]
+        self.last_seqs = [0 for _ in streams]
+        self.was_detected = [{} for _ in streams]
+        self.display_latency = None
+        self.result_latency = None
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
+        self.ui_timer = QTimer()
+        self.ui_timer.timeout.connect(self.refresh_ui)
         
-        # Equipment status tracking
-        self.equipment_status = {
+        # Equipment status tracking, one entry per stream
+        self.equipment_status = [{
             'FireExtinguisher': {'detected': False, 'last_seen': None, 'location': None},
             'ToolBox': {'detected': False, 'last_seen': None, 'location': None},
             'OxygenTank': {'detected': False, 'last_seen': None, 'location': None}
-        }
+        } for _ in streams]
         
         self.init_ui()
         self.load_model()
+        self.ui_timer.start(ui_refresh_ms)
     
     def init_ui(self):
         """Initialize the user interface"""
@@ -102,12 +499,18 @@ class SpaceStationScanner(QMainWindow):
         left_panel = QWidget()
         left_layout = QVBoxLayout(left_panel)
         
-        # Video display
-        self.video_label = QLabel("No video feed")
-        self.video_label.setMinimumSize(800, 600)
-        self.video_label.setStyleSheet("border: 2px solid #444; background-color: #1a1a1a;")
-        self.video_label.setAlignment(Qt.AlignCenter)
-        left_layout.addWidget(self.video_label)
+        # Video display, one view per stream in a grid
+        video_layout = QGridLayout()
+        columns = int(np.ceil(np.sqrt(len(self.sources))))
+        self.video_labels = []
+        for i in range(len(self.sources)):
+            video_label = VideoLabel("No video feed")
+            video_label.setMinimumSize(800 // columns, 600 // columns)
+            video_label.setStyleSheet("border: 2px solid #444; background-color: #1a1a1a;")
+            video_label.setAlignment(Qt.AlignCenter)
+            video_layout.addWidget(video_label, i // columns, i % columns)
+            self.video_labels.append(video_label)
+        left_layout.addLayout(video_layout)
         
         # Control buttons
         control_layout = QHBoxLayout()
@@ -135,28 +538,39 @@ class SpaceStationScanner(QMainWindow):
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
         
-        # Equipment status
-        status_group = QGroupBox("Equipment Status")
-        status_group.setStyleSheet("QGroupBox { font-weight: bold; color: white; }")
-        status_layout = QGridLayout(status_group)
-        
-        self.status_labels = {}
-        row = 0
-        for equipment in self.equipment_status.keys():
-            # Equipment name
-            name_label = QLabel(equipment)
-            name_label.setStyleSheet("color: #00ff00; font-weight: bold;")
-            status_layout.addWidget(name_label, row, 0)
-            
-            # Status indicator
-            status_label = QLabel("❌ Not Detected")
-            status_label.setStyleSheet("color: #ff4444; font-weight: bold;")
-            self.status_labels[equipment] = status_label
-            status_layout.addWidget(status_label, row, 1)
-            
-            row += 1
-        
-        right_layout.addWidget(status_group)
+        # Equipment status, one panel per stream
+        self.status_labels = []
+        self.stream_labels = []
+        for stream, source in enumerate(self.sources):
+            title = "Equipment Status" if len(self.sources) == 1 else f"{self.stream_name(stream)}: {source}"
+            status_group = QGroupBox(title)
+            status_group.setStyleSheet("QGroupBox { font-weight: bold; color: white; }")
+            status_layout = QGridLayout(status_group)
+
+            status_labels = {}
+            row = 0
+            for equipment in self.equipment_status[stream].keys():
+                # Equipment name
+                name_label = QLabel(equipment)
+                name_label.setStyleSheet("color: #00ff00; font-weight: bold;")
+                status_layout.addWidget(name_label, row, 0)
+
+                # Status indicator
+                status_label = QLabel("❌ Not Detected")
+                status_label.setStyleSheet("color: #ff4444; font-weight: bold;")
+                status_labels[equipment] = status_label
+                status_layout.addWidget(status_label, row, 1)
+
+                row += 1
+            self.status_labels.append(status_labels)
+
+            # Per stream inference rate
+            stream_label = QLabel("")
+            stream_label.setStyleSheet("color: #cccccc;")
+            status_layout.addWidget(stream_label, row, 0, 1, 2)
+            self.stream_labels.append(stream_label)
+
+            right_layout.addWidget(status_group)
         
         # Detection settings
         settings_group = QGroupBox("Detection Settings")
@@ -175,6 +589,19 @@ class SpaceStationScanner(QMainWindow):
         self.conf_slider.valueChanged.connect(lambda v: self.conf_label.setText(f"{v}%"))
         conf_layout.addWidget(self.conf_label)
         settings_layout.addLayout(conf_layout)
+
+        # Latency budget of the adaptive input resolution, 0 keeps the largest size
+        latency_layout = QHBoxLayout()
+        latency_layout.addWidget(QLabel("Target latency:"))
+        self.latency_spin = QSpinBox()
+        self.latency_spin.setRange(0, 2000)
+        self.latency_spin.setSingleStep(10)
+        self.latency_spin.setSuffix(" ms")
+        self.latency_spin.setSpecialValueText("Off")
+        self.latency_spin.setValue(self.target_latency_ms)
+        self.latency_spin.valueChanged.connect(self.update_target_latency)
+        latency_layout.addWidget(self.latency_spin)
+        settings_layout.addLayout(latency_layout)
         
         right_layout.addWidget(settings_group)
         
@@ -183,10 +610,13 @@ class SpaceStationScanner(QMainWindow):
         alert_group.setStyleSheet("QGroupBox { font-weight: bold; color: white; }")
         alert_layout = QVBoxLayout(alert_group)
         
-        self.alert_log = QTextEdit()
-        self.alert_log.setMaximumHeight(200)
-        self.alert_log.setStyleSheet("background-color: #1a1a1a; color: #ffffff; border: 1px solid #444;")
-        alert_layout.addWidget(self.alert_log)
+        self.alert_view = QTextEdit()
+        self.alert_view.setReadOnly(True)
+        self.alert_view.setMaximumHeight(200)
+        self.alert_view.setStyleSheet("background-color: #1a1a1a; color: #ffffff; border: 1px solid #444;")
+        # The view keeps the same number of alerts as the ring, older ones are in the alert file
+        self.alert_view.document().setMaximumBlockCount(self.alert_log.capacity)
+        alert_layout.addWidget(self.alert_view)
         
         right_layout.addWidget(alert_group)
         
@@ -195,7 +625,7 @@ class SpaceStationScanner(QMainWindow):
         info_group.setStyleSheet("QGroupBox { font-weight: bold; color: white; }")
         info_layout = QVBoxLayout(info_group)
         
-        self.info_label = QLabel("Model: YOLOv8s\nStatus: Ready")
+        self.info_label = QLabel(f"Model: YOLOv8s ({self.backend})\nStatus: Ready")
         self.info_label.setStyleSheet("color: #cccccc;")
         info_layout.addWidget(self.info_label)
         
@@ -220,23 +650,46 @@ class SpaceStationScanner(QMainWindow):
         """Load the trained YOLOv8 model"""
         try:
             if os.path.exists(self.model_path):
-                self.detection_thread = DetectionThread(self.model_path)
+                self.detection_thread = self.create_detection_thread()
+                self.detection_thread.conf_threshold = self.conf_threshold
                 self.detection_thread.detection_signal.connect(self.process_detections)
                 self.detection_thread.alert_signal.connect(self.add_alert)
                 self.detection_thread.start()
                 self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Model loaded successfully.")
             else:
-                self.alert_log.append("<span style='color:red'>Error: Model file not found. Please train the model first.</span>")
+                self.alert_log.append("<span style='color:red'>Error: Model file not found. Please train the model first.</span>", 'ERROR')
         except Exception as e:
-            self.alert_log.append(f"<span style='color:red'>Error: Failed to load model: {str(e)}</span>")
+            self.alert_log.append(f"<span style='color:red'>Error: Failed to load model: {str(e)}</span>", 'ERROR')
             
+    def create_detection_thread(self):
+        return DetectionThread(self.model_path, self.backend, self.keyframe_interval,
+                               ladder=self.ladder, target_latency_ms=self.target_latency_ms,
+                               streams=len(self.sources), stream_weights=self.stream_weights,
+                               max_fps=self.stream_fps, max_batch=self.max_batch, batch_wait_ms=self.batch_wait_ms)
+
+    def stream_name(self, stream):
+        return f"Camera {stream + 1}"
+
+    def stream_prefix(self, stream):
+        """Alert prefix naming the stream, empty with a single stream"""
+        return "" if len(self.sources) == 1 else f"[{self.stream_name(stream)}] "
+
     def toggle_camera(self):
-        """Toggle camera on/off"""
-        if self.camera is None:
-            self.camera = cv2.VideoCapture(0)
-            if not self.camera.isOpened():
-                self.alert_log.append("<span style='color:red'>Error: Cannot open camera.</span>")
-                self.camera = None
+        """Toggle the cameras on/off"""
+        if not any(self.cameras):
+            for stream, source in enumerate(self.sources):
+                camera = FrameCapture(source)
+                if not camera.is_opened():
+                    self.alert_log.append(f"<span style='color:red'>Error: {self.stream_prefix(stream)}"
+                                          f"Cannot open camera.</span>", 'ERROR')
+                    camera.stop()
+                    continue
+                camera.start()
+                self.cameras[stream] = camera
+                self.last_seqs[stream] = 0
+                if self.motion_gates[stream]:
+                    self.motion_gates[stream].force()
+            if not any(self.cameras):
                 return
             self.timer.start(30)
             self.camera_btn.setEnabled(False)
@@ -246,101 +699,104 @@ class SpaceStationScanner(QMainWindow):
         else:
             self.stop_camera()
             
-    def stop_camera(self):
-        """Stop the camera"""
-        if self.camera:
+    def stop_camera(self, stream=None):
+        """Stop one camera, or all of them"""
+        streams = range(len(self.cameras)) if stream is None else [stream]
+        for i in streams:
+            if self.cameras[i]:
+                self.cameras[i].stop()
+                self.cameras[i] = None
+                if self.detection_thread is not None:
+                    self.detection_thread.clear_stream(i)
+                self.last_detections[i] = []
+                self.video_labels[i].show_text("No video feed")
+        if not any(self.cameras):
             self.timer.stop()
-            self.camera.release()
-            self.camera = None
-            self.video_label.setText("No video feed")
             self.camera_btn.setEnabled(True)
             self.upload_btn.setEnabled(True)
             self.screenshot_btn.setEnabled(True)
             self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Camera stopped.")
             
     def update_frame(self):
-        """Update video frame from camera"""
-        if self.camera:
-            ret, frame = self.camera.read()
-            if not ret:
-                self.alert_log.append("<span style='color:red'>Error: Failed to read frame.</span>")
-                self.stop_camera()
-                return
-            self.current_frame = frame
-            detections = self.detect_equipment(frame)
-            self.display_frame(frame, detections)
-            self.update_status(detections)
-            self.log_alerts(detections)
+        """Update video frames from the cameras"""
+        for stream, camera in enumerate(self.cameras):
+            if camera is None:
+                continue
+            if camera.error:
+                self.alert_log.append(f"<span style='color:red'>Error: {self.stream_prefix(stream)}{camera.error}.</span>", 'ERROR')
+                self.stop_camera(stream)
+                continue
+            seq, timestamp, frame = camera.latest()
+            if frame is None or seq == self.last_seqs[stream]:
+                continue  # no new frame since the last tick
+            self.last_seqs[stream] = seq
+            self.current_frames[stream] = frame
+            # Hand the frame to the inference worker and keep going, results arrive via process_detections
+            gate = self.motion_gates[stream]
+            if self.detection_thread is not None and (gate is None or gate.should_detect(frame, timestamp)):
+                self.detection_thread.update_frame(frame, timestamp, stream)
+            self.display_frame(frame, self.last_detections[stream], stream, keep=False)
+            self.display_latency = time.monotonic() - timestamp
             
     def detect_equipment(self, frame):
         """Detect equipment in the frame"""
         if not hasattr(self, 'detection_thread') or self.detection_thread is None:
             return []
-        
-        # YOLO expects RGB
-        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.detection_thread.model(img, conf=self.conf_threshold)
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    conf = box.conf[0].cpu().numpy()
-                    cls = int(box.cls[0].cpu().numpy())
-                    if conf >= self.conf_threshold and 0 <= cls < len(CLASS_NAMES):
-                        detections.append({
-                            'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                            'confidence': float(conf),
-                            'class': CLASS_NAMES[cls],
-                            'class_id': cls
-                        })
-        return detections
+        return detect_equipment(self.detection_thread.model, frame, self.conf_threshold)
 
-    def display_frame(self, frame, detections):
-        """Display frame with detected equipment"""
-        # Draw bounding boxes
-        for det in detections:
-            x1, y1, x2, y2 = det['bbox']
-            label = f"{det['class']} {det['confidence']*100:.1f}%"
-            color = (0, 255, 0)
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(frame, label, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-        # Convert to QImage
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb.shape
-        bytes_per_line = ch * w
-        qt_img = QImage(rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        self.video_label.setPixmap(QPixmap.fromImage(qt_img))
+    def display_frame(self, frame, detections, stream=0, keep=True):
+        """Display frame with detected equipment, boxes are drawn on the display buffer, not the frame"""
+        self.video_labels[stream].show_frame(frame, detections, keep)
 
     def update_confidence(self, value):
         """Update confidence threshold"""
         self.conf_threshold = value / 100.0
         self.conf_label.setText(f"{value}%")
+        if self.detection_thread:
+            self.detection_thread.conf_threshold = self.conf_threshold
 
-    def update_status(self, detections):
-        """Update equipment status"""
+    def update_target_latency(self, value):
+        """Update the latency budget of the adaptive input resolution"""
+        self.target_latency_ms = value
+        if self.detection_thread:
+            self.detection_thread.resolution.set_target(value)
+
+    def update_status(self, detections, stream=0):
+        """Update equipment status, labels are only restyled when their state changes"""
         detected = {name: False for name in CLASS_NAMES}
         for det in detections:
             detected[det['class']] = True
+        status_labels = self.status_labels[stream]
         for name in CLASS_NAMES:
+            if self.shown_status[stream].get(name) == detected[name]:
+                continue
+            self.shown_status[stream][name] = detected[name]
             if detected[name]:
-                self.status_labels[name].setText(f"{name}: ✅ Detected")
-                self.status_labels[name].setStyleSheet("color: #00ff00;")
+                status_labels[name].setText(f"{name}: ✅ Detected")
+                status_labels[name].setStyleSheet("color: #00ff00;")
             else:
-                self.status_labels[name].setText(f"{name}: ❌ Not Detected")
-                self.status_labels[name].setStyleSheet("color: #ff4444;")
-        self.equipment_status = detected
+                status_labels[name].setText(f"{name}: ❌ Not Detected")
+                status_labels[name].setStyleSheet("color: #ff4444;")
+        self.equipment_status[stream] = detected
+
+    def log_alerts(self, detections, stream=0):
+        """Log alerts for detected or missing equipment
 
-    def log_alerts(self, detections):
-        """Log alerts for detected or missing equipment"""
+        With tracking enabled the detections are tracks, which outlive a few
+        missed keyframes, so a class is only reported missing once all of its
+        tracks are gone.
+        """
         now = datetime.now().strftime('%H:%M:%S')
+        prefix = self.stream_prefix(stream)
+        status, was_detected = self.equipment_status[stream], self.was_detected[stream]
         for name in CLASS_NAMES:
-            if self.equipment_status[name] and not getattr(self, f'was_{name}_detected', False):
-                self.alert_log.append(f"<b>{now}</b>: <span style='color:lime'>{name} detected.</span>")
-            if not self.equipment_status[name] and getattr(self, f'was_{name}_detected', True):
-                self.alert_log.append(f"<b>{now}</b>: <span style='color:orange'>{name} missing!</span>")
-            setattr(self, f'was_{name}_detected', self.equipment_status[name])
+            if status[name] and not was_detected.get(name, False):
+                track_ids = [f"#{det['track_id']}" for det in detections if det['class'] == name and 'track_id' in det]
+                tracks = f" (track {', '.join(track_ids)})" if track_ids else ""
+                self.alert_log.append(f"<b>{now}</b>: <span style='color:lime'>{prefix}{name} detected{tracks}.</span>")
+            if not status[name] and was_detected.get(name, True):
+                self.alert_log.append(f"<b>{now}</b>: <span style='color:orange'>{prefix}{name} missing!</span>", 'WARNING')
+            was_detected[name] = status[name]
 
     def add_alert(self, level, message):
         """Add alert to the log"""
@@ -351,15 +807,20 @@ class SpaceStationScanner(QMainWindow):
             "ERROR": "#ff4444"
         }.get(level, "#ffffff")
         
-        self.alert_log.append(f'<span style="color: {color}">[{timestamp}] {level}: {message}</span>')
+        self.alert_log.append(f'<span style="color: {color}">[{timestamp}] {level}: {message}</span>', level)
 
     def closeEvent(self, event):
         """Handle application close event"""
+        self.ui_timer.stop()
+        self.alert_log.close()
+        if self.model_loader is not None:
+            self.model_loader.wait()
         if self.detection_thread:
             self.detection_thread.stop()
             self.detection_thread.wait()
-        if self.camera:
-            self.camera.release()
+        for camera in self.cameras:
+            if camera:
+                camera.stop()
         event.accept()
 
     def get_button_style(self):
@@ -374,14 +835,14 @@ class SpaceStationScanner(QMainWindow):
         if file_path:
             image = cv2.imread(file_path)
             if image is not None:
-                self.current_frame = image
+                self.current_frames[0] = image
                 detections = self.detect_equipment(image)
                 self.display_frame(image, detections)
                 self.update_status(detections)
                 self.log_alerts(detections)
                 self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Image loaded: {os.path.basename(file_path)}")
             else:
-                self.alert_log.append(f"<span style='color:red'>Error: Failed to load image.</span>")
+                self.alert_log.append(f"<span style='color:red'>Error: Failed to load image.</span>", 'ERROR')
 
     def add_ota_update_button(self, right_layout):
         self.ota_btn = QPushButton("Reload Model Weights (OTA Update)")
@@ -389,39 +850,168 @@ class SpaceStationScanner(QMainWindow):
         self.ota_btn.clicked.connect(self.reload_model)
         right_layout.addWidget(self.ota_btn)
 
+        self.rollback_btn = QPushButton("Roll Back Model")
+        self.rollback_btn.setStyleSheet(self.get_button_style())
+        self.rollback_btn.clicked.connect(self.rollback_model)
+        self.rollback_btn.setEnabled(False)
+        right_layout.addWidget(self.rollback_btn)
+
     def reload_model(self):
-        try:
-            if self.detection_thread:
-                self.detection_thread.stop()
-                self.detection_thread.wait()
-            self.detection_thread = DetectionThread(self.model_path)
-            self.detection_thread.detection_signal.connect(self.process_detections)
-            self.detection_thread.alert_signal.connect(self.add_alert)
-            self.detection_thread.start()
-            self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Model reloaded from {self.model_path}")
-        except Exception as e:
-            self.alert_log.append(f"<span style='color:red'>Error: Failed to reload model: {str(e)}</span>")
+        """Load the weights again in the background, detection keeps running on the current model meanwhile"""
+        if self.detection_thread is None:
+            self.load_model()
+            return
+        if self.model_loader is not None and self.model_loader.isRunning():
+            self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Model update already in progress.")
+            return
+        self.ota_btn.setEnabled(False)
+        self.model_loader = ModelLoaderThread(self.model_path, self.backend, self.ladder, self.conf_threshold,
+                                              self.detection_thread.reference_snapshot(), self.swap_min_agreement)
+        self.model_loader.loaded_signal.connect(self.swap_model)
+        self.model_loader.alert_signal.connect(self.add_alert)
+        self.model_loader.finished.connect(lambda: self.ota_btn.setEnabled(True))
+        self.model_loader.start()
+        self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Loading {self.model_path} in the background...")
+
+    def swap_model(self, model, summary):
+        """Hot swap a loaded model into the running worker"""
+        self.detection_thread.swap_model(model)
+        self.rollback_btn.setEnabled(True)
+        self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Model swapped in ({summary}).")
+
+    def rollback_model(self):
+        """Swap the previous model back in"""
+        if self.detection_thread and self.detection_thread.rollback():
+            self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Rolled back to the previous model.")
 
     def take_screenshot(self):
-        if hasattr(self, 'current_frame') and self.current_frame is not None:
+        if any(frame is not None for frame in self.current_frames):
             now = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'screenshot_{now}.png'
-            cv2.imwrite(filename, self.current_frame)
-            self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Screenshot saved as {filename}")
+            for stream, frame in enumerate(self.current_frames):
+                if frame is None:
+                    continue
+                # Camera frames are capture ring views, copy before the reader wraps around to this slot
+                frame = frame.copy()
+                suffix = "" if len(self.sources) == 1 else f"_cam{stream + 1}"
+                filename = f'screenshot_{now}{suffix}.png'
+                cv2.imwrite(filename, frame)
+                self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: Screenshot saved as {filename}")
         else:
-            self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: <span style='color:orange'>No frame to save!</span>")
+            self.alert_log.append(f"<b>{datetime.now().strftime('%H:%M:%S')}</b>: <span style='color:orange'>No frame to save!</span>", 'WARNING')
+
+    def process_detections(self, stream, detections, timestamp, generation):
+        """Take over results from the inference worker, the next camera tick draws them"""
+        if self.detection_thread is None or generation != self.detection_thread.streams[stream].generation:
+            return  # the stream was stopped after this frame was taken
+        self.last_detections[stream] = detections
+        if timestamp:
+            self.result_latency = time.monotonic() - timestamp
+        self.update_status(detections, stream)
+        self.log_alerts(detections, stream)
+        self.ui_dirty = True
+
+    def refresh_ui(self):
+        """Coalesced UI refresh on ui_timer: new alerts, per stream rates and the info panel"""
+        for entry in self.alert_log.drain():
+            self.alert_view.append(entry)
+        if not self.ui_dirty:
+            return
+        self.ui_dirty = False
+        if self.detection_thread:
+            for stream, slot in enumerate(self.detection_thread.streams):
+                if slot.fps is not None:
+                    self.stream_labels[stream].setText(f"Inference: {slot.fps:.1f} FPS, {slot.frames_dropped} dropped")
+        self.update_info()
+
+    def update_info(self):
+        """Refresh the System Information panel"""
+        lines = [f"Model: YOLOv8s ({self.backend})", "Status: Ready"]
+        if self.detection_thread:
+            lines.append(f"Frames inferred: {self.detection_thread.frames_processed}  "
+                         f"dropped: {self.detection_thread.frames_dropped}")
+            resolution = self.detection_thread.resolution
+            line = f"Resolution: {resolution.imgsz} px"
+            if resolution.imgsz in resolution.latency_ms:
+                line += f", detector {resolution.latency_ms[resolution.imgsz]:.0f} ms"
+            if resolution.target_ms:
+                line += f" (target {resolution.target_ms:.0f} ms)"
+            lines.append(line)
+            if self.detection_thread.fps is not None:
+                lines.append(f"Achieved: {self.detection_thread.fps:.1f} FPS")
+            trackers = [slot.tracker for slot in self.detection_thread.streams if slot.tracker is not None]
+            if trackers:
+                lines.append(f"Keyframes: {sum(t.keyframes for t in trackers)} of {sum(t.frames for t in trackers)} "
+                             f"frames, {sum(len(t.tracks) for t in trackers)} tracks")
+        gates = [gate for gate in self.motion_gates if gate and gate.frames]
+        if gates:
+            hits, frames = sum(gate.hits for gate in gates), sum(gate.frames for gate in gates)
+            lines.append(f"Motion gate: {hits / frames * 100:.0f}% of {frames} frames skipped inference")
+        if self.display_latency is not None:
+            lines.append(f"Capture to display: {self.display_latency*1000:.0f} ms")
+        if self.result_latency is not None:
+            lines.append(f"Capture to detections: {self.result_latency*1000:.0f} ms")
+        costs = [label.display_ms() for label in self.video_labels if label.display_ms() is not None]
+        display_ms = sum(costs) if costs else None
+        if display_ms is not None:
+            lines.append(f"Display cost: {display_ms:.1f} ms/frame")
+        text = "\n".join(lines)
+        if text != self.shown_info:
+            self.shown_info = text
+            self.info_label.setText(text)
+
+def _float_list(value):
+    return [float(v) for v in value.split(',')]
 
-    def process_detections(self, detections, frame):
-        self.current_frame = frame
-        self.display_frame(frame, detections)
-        self.update_status(detections)
-        self.log_alerts(detections)
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backend', type=str, default='torch', choices=inference_backend.BACKENDS,
+                        help='Inference backend, onnx/openvino are exported once and cached next to the weights')
+    parser.add_argument('--source', type=str, nargs='+', default=['0'],
+                        help='OpenCV sources: camera index, video file or stream URL (e.g. rtsp://localhost:8554/cam), '
+                             'several sources are inferred together in one batch')
+    parser.add_argument('--stream-weights', type=_float_list, default=None,
+                        help='Comma separated share of inference per source when not all fit in a batch')
+    parser.add_argument('--stream-fps', type=_float_list, default=None,
+                        help='Comma separated inference FPS cap per source, one value applies to all')
+    parser.add_argument('--max-batch', type=int, default=None, help='Most frames per batched call (default: all sources)')
+    parser.add_argument('--alert-capacity', type=int, default=500, help='Alerts kept in memory and in the alert view')
+    parser.add_argument('--alert-file', type=str, default='scanner_alerts.log',
+                        help='Rotating file every alert is written to (empty to disable)')
+    parser.add_argument('--ui-refresh-ms', type=int, default=250, help='Interval of the coalesced alert and status refresh')
+    parser.add_argument('--batch-wait-ms', type=float, default=10,
+                        help='How long the first ready frame waits for the other sources to fill the batch')
+    parser.add_argument('--keyframe-interval', type=int, default=1,
+                        help='Run the detector every N frames and track objects in between (1 disables tracking)')
+    parser.add_argument('--target-latency-ms', type=int, default=0,
+                        help='Detector latency budget, the input size adapts to meet it (0 keeps the largest size)')
+    parser.add_argument('--imgsz-ladder', type=str, default=','.join(str(s) for s in DEFAULT_LADDER),
+                        help='Comma separated input sizes the adaptive resolution switches between')
+    parser.add_argument('--motion-gate', action='store_true',
+                        help='Skip inference while the scene is static and reuse the last detections')
+    parser.add_argument('--min-refresh-s', type=float, default=2.0,
+                        help='With --motion-gate, run the detector at least this often even on a static scene')
+    parser.add_argument('--swap-min-agreement', type=float, default=0.0,
+                        help='Reject reloaded weights whose detections agree less than this (0-1) with the running '
+                             'model on recent reference frames (0 disables the check)')
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setApplicationName("Space Station Equipment Scanner")
     
-    window = SpaceStationScanner()
+    ladder = [int(size) for size in args.imgsz_ladder.split(',')]
+    streams = len(args.source)
+    stream_fps = args.stream_fps * streams if args.stream_fps and len(args.stream_fps) == 1 else args.stream_fps
+    for name, values in [('--stream-weights', args.stream_weights), ('--stream-fps', stream_fps)]:
+        if values and len(values) != streams:
+            parser.error(f"{name} needs one value per source ({streams})")
+    window = SpaceStationScanner(backend=args.backend, sources=args.source, keyframe_interval=args.keyframe_interval,
+                                 ladder=ladder, target_latency_ms=args.target_latency_ms,
+                                 motion_gate=args.motion_gate, min_refresh_s=args.min_refresh_s,
+                                 swap_min_agreement=args.swap_min_agreement, stream_weights=args.stream_weights,
+                                 stream_fps=stream_fps, max_batch=args.max_batch, batch_wait_ms=args.batch_wait_ms,
+                                 alert_capacity=args.alert_capacity, alert_file=args.alert_file or None,
+                                 ui_refresh_ms=args.ui_refresh_ms)
     window.show()
     
     sys.exit(app.exec_())
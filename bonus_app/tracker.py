@@ -0,0 +1,187 @@
+import numpy as np
+
+
+def _to_xyah(bbox):
+    x1, y1, x2, y2 = bbox
+    w, h = max(x2 - x1, 1e-3), max(y2 - y1, 1e-3)
+    return np.array([x1 + w / 2, y1 + h / 2, w / h, h])
+
+
+def _to_xyxy(xyah):
+    cx, cy, a, h = xyah[:4]
+    w = a * h
+    return [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]
+
+
+def _iou(box1, box2):
+    ix1, iy1 = max(box1[0], box2[0]), max(box1[1], box2[1])
+    ix2, iy2 = min(box1[2], box2[2]), min(box1[3], box2[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
+    area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
+    return inter / (area1 + area2 - inter + 1e-9)
+
+
+class KalmanBoxFilter:
+    """Constant velocity Kalman filter over (center x, center y, aspect ratio, height), as in ByteTrack"""
+
+    std_position = 1.0 / 20
+    std_velocity = 1.0 / 160
+
+    def __init__(self):
+        self.motion = np.eye(8)
+        self.motion[:4, 4:] = np.eye(4)
+        self.observation = np.eye(4, 8)
+
+    def initiate(self, measurement):
+        mean = np.concatenate((measurement, np.zeros(4)))
+        h = measurement[3]
+        std = [2 * self.std_position * h, 2 * self.std_position * h, 1e-2, 2 * self.std_position * h,
+               10 * self.std_velocity * h, 10 * self.std_velocity * h, 1e-5, 10 * self.std_velocity * h]
+        return mean, np.diag(np.square(std))
+
+    def predict(self, mean, covariance):
+        h = mean[3]
+        std = [self.std_position * h, self.std_position * h, 1e-2, self.std_position * h,
+               self.std_velocity * h, self.std_velocity * h, 1e-5, self.std_velocity * h]
+        mean = self.motion @ mean
+        covariance = self.motion @ covariance @ self.motion.T + np.diag(np.square(std))
+        return mean, covariance
+
+    def update(self, mean, covariance, measurement):
+        h = mean[3]
+        std = [self.std_position * h, self.std_position * h, 1e-1, self.std_position * h]
+        projected_mean = self.observation @ mean
+        projected_cov = self.observation @ covariance @ self.observation.T + np.diag(np.square(std))
+        gain = np.linalg.solve(projected_cov, self.observation @ covariance).T
+        mean = mean + gain @ (measurement - projected_mean)
+        covariance = covariance - gain @ projected_cov @ gain.T
+        return mean, covariance
+
+
+class Track:
+    """One tracked object with a stable id"""
+
+    def __init__(self, track_id, detection, kalman):
+        self.track_id = track_id
+        self.class_id = detection['class_id']
+        self.class_name = detection['class']
+        self.score = detection['confidence']
+        self.mean, self.covariance = kalman.initiate(_to_xyah(detection['bbox']))
+        self.hits = 1
+        self.misses = 0
+
+    def bbox(self):
+        return _to_xyxy(self.mean)
+
+
+class ByteTracker:
+    """IoU + Kalman tracker with ByteTrack's two stage association
+
+    update() takes detector output on keyframes: high confidence detections are
+    matched to tracks first, then low confidence ones may still extend
+    unmatched tracks. predict() carries the boxes forward on the frames in
+    between, decaying each track's confidence so a keyframe is requested when
+    the tracks are no longer trustworthy.
+    """
+
+    def __init__(self, high_thresh=0.5, low_thresh=0.1, match_iou=0.3, max_misses=3, min_hits=2,
+                 score_decay=0.97):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.match_iou = match_iou
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.score_decay = score_decay
+        self.kalman = KalmanBoxFilter()
+        self.tracks = []
+        self.next_id = 1
+        self.frames_since_keyframe = 0
+        self.keyframes = 0
+        self.frames = 0
+
+    def needs_keyframe(self, interval, refresh_conf):
+        """Run the detector every `interval` frames, or earlier when track confidence drops"""
+        if self.keyframes == 0 or self.frames_since_keyframe + 1 >= interval:
+            return True
+        return any(track.score < refresh_conf for track in self.tracks if track.hits >= self.min_hits)
+
+    def _predict_tracks(self):
+        for track in self.tracks:
+            track.mean, track.covariance = self.kalman.predict(track.mean, track.covariance)
+
+    def predict(self):
+        """Advance every track by one frame without a detector result"""
+        self._predict_tracks()
+        for track in self.tracks:
+            track.score *= self.score_decay
+        self.frames += 1
+        self.frames_since_keyframe += 1
+
+    def _associate(self, tracks, detections):
+        """Greedy one-to-one matching of same-class pairs by descending IoU"""
+        pairs = []
+        for ti, track in enumerate(tracks):
+            track_box = track.bbox()
+            for di, det in enumerate(detections):
+                if det['class_id'] != track.class_id:
+                    continue
+                iou = _iou(track_box, det['bbox'])
+                if iou >= self.match_iou:
+                    pairs.append((iou, ti, di))
+        matched_tracks, matched_dets, matches = set(), set(), []
+        for _, ti, di in sorted(pairs, reverse=True):
+            if ti in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            matches.append((tracks[ti], detections[di]))
+        unmatched_tracks = [t for i, t in enumerate(tracks) if i not in matched_tracks]
+        unmatched_dets = [d for i, d in enumerate(detections) if i not in matched_dets]
+        return matches, unmatched_tracks, unmatched_dets
+
+    def _apply(self, track, detection):
+        track.mean, track.covariance = self.kalman.update(track.mean, track.covariance, _to_xyah(detection['bbox']))
+        track.score = detection['confidence']
+        track.hits += 1
+        track.misses = 0
+
+    def update(self, detections):
+        """Feed a keyframe's detections (confidence >= low_thresh)"""
+        self._predict_tracks()
+        high = [d for d in detections if d['confidence'] >= self.high_thresh]
+        low = [d for d in detections if self.low_thresh <= d['confidence'] < self.high_thresh]
+
+        matches, remaining, unmatched_high = self._associate(self.tracks, high)
+        for track, det in matches:
+            self._apply(track, det)
+        matches, remaining, _ = self._associate(remaining, low)
+        for track, det in matches:
+            self._apply(track, det)
+        for track in remaining:
+            track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        for det in unmatched_high:
+            self.tracks.append(Track(self.next_id, det, self.kalman))
+            self.next_id += 1
+
+        self.frames += 1
+        self.keyframes += 1
+        self.frames_since_keyframe = 0
+
+    def detections(self):
+        """Confirmed tracks in the scanner's detection format plus a track_id"""
+        confirmed = []
+        for track in self.tracks:
+            # Tracks seen on the very first keyframe are reported right away
+            if track.hits < self.min_hits and self.keyframes > 1:
+                continue
+            x1, y1, x2, y2 = track.bbox()
+            confirmed.append({
+                'bbox': [int(x1), int(y1), int(x2), int(y2)],
+                'confidence': float(track.score),
+                'class': track.class_name,
+                'class_id': track.class_id,
+                'track_id': track.track_id,
+            })
+        return confirmed
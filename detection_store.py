@@ -0,0 +1,125 @@
+import os
+import threading
+import numpy as np
+
+# One row per box: [class_id, x_center, y_center, width, height, confidence], pixel coordinates
+DETECTION_COLUMNS = ['class_id', 'x_center', 'y_center', 'width', 'height', 'confidence']
+DETECTION_DTYPE = np.float32
+
+
+def result_to_detections(result):
+    """Convert an ultralytics Result to an (n, 6) detection array in one bulk copy"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, len(DETECTION_COLUMNS)), dtype=DETECTION_DTYPE)
+    return np.column_stack((
+        boxes.cls.cpu().numpy(),
+        boxes.xywh.cpu().numpy(),
+        boxes.conf.cpu().numpy(),
+    )).astype(DETECTION_DTYPE)
+
+
+def write_yolo_txt(path, detections):
+    """Write detections as a YOLO style label file [class_id, x_center, y_center, width, height]"""
+    lines = [f"{int(cls_id)} {x_center} {y_center} {width} {height}\n"
+             for cls_id, x_center, y_center, width, height, _ in detections.tolist()]
+    with open(path, 'w') as f:
+        f.writelines(lines)
+
+
+class DetectionStoreWriter:
+    """Append-only binary detection file with a line based offset index
+
+    `path` holds the float32 detection rows of every image back to back and
+    `path.idx` holds one `name offset count height width` line per image.
+    Both files are only ever appended to; a name written twice resolves to its
+    last entry.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = str(path)
+        self.index_path = self.path + '.idx'
+        mode = 'ab' if append else 'wb'
+        self.data_file = open(self.path, mode)
+        self.index_file = open(self.index_path, mode.replace('b', ''))
+        self.offset = self.data_file.seek(0, os.SEEK_END)
+        self.lock = threading.Lock()
+
+    def write(self, name, detections, shape=(0, 0)):
+        """Append the detections of one image, shape is its (height, width)"""
+        data = np.ascontiguousarray(detections, dtype=DETECTION_DTYPE).tobytes()
+        with self.lock:
+            self.data_file.write(data)
+            self.index_file.write(f"{name}\t{self.offset}\t{len(detections)}\t{shape[0]}\t{shape[1]}\n")
+            self.offset += len(data)
+
+    def close(self):
+        with self.lock:
+            self.data_file.close()
+            self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DetectionStoreReader:
+    """Random access reader for a file written by DetectionStoreWriter
+
+    Only the index is parsed up front; the detections of one image are a slice
+    of a read-only memory map, so lookups never scan the data file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.index = {}
+        with open(self.path + '.idx', 'r') as f:
+            for line in f:
+                name, offset, count, height, width = line.rstrip('\n').split('\t')
+                self.index[name] = (int(offset), int(count), (int(height), int(width)))
+        row_bytes = len(DETECTION_COLUMNS) * np.dtype(DETECTION_DTYPE).itemsize
+        if os.path.getsize(self.path) >= row_bytes:
+            self.data = np.memmap(self.path, dtype=DETECTION_DTYPE, mode='r')
+        else:
+            self.data = np.zeros(0, dtype=DETECTION_DTYPE)
+
+    def names(self):
+        return list(self.index.keys())
+
+    def shape(self, name):
+        """(height, width) of the image the detections belong to"""
+        return self.index[name][2]
+
+    def get(self, name):
+        """Return the (n, 6) detections of one image"""
+        offset, count, _ = self.index[name]
+        start = offset // np.dtype(DETECTION_DTYPE).itemsize
+        rows = self.data[start:start + count * len(DETECTION_COLUMNS)]
+        return rows.reshape(count, len(DETECTION_COLUMNS))
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+
+def export_yolo_txt(store_path, labels_dir):
+    """Export every image in a detection store as YOLO txt label files"""
+    reader = DetectionStoreReader(store_path)
+    os.makedirs(labels_dir, exist_ok=True)
+    for name in reader.names():
+        write_yolo_txt(os.path.join(labels_dir, os.path.splitext(name)[0] + '.txt'), reader.get(name))
+    return len(reader)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Export a detection store to YOLO txt label files')
+    parser.add_argument('store', type=str, help='Path of the detection store')
+    parser.add_argument('labels_dir', type=str, help='Directory to write the label files to')
+    args = parser.parse_args()
+    count = export_yolo_txt(args.store, args.labels_dir)
+    print(f"Exported {count} label files to {args.labels_dir}")
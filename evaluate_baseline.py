@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 import json
+from run_registry import RunRegistry
 
 def analyze_baseline_results():
     """Analyze baseline training results and generate documentation"""
@@ -68,6 +69,11 @@ def analyze_baseline_results():
         json.dump(results_summary, f, indent=2)
     
     print(f"\nResults saved to: baseline_results.json")
+
+    # Register the baseline so it ranks alongside the sweep runs
+    registry = RunRegistry()
+    registry.ingest_run_dir('runs/detect/train', name='baseline', sweep='baseline')
+    registry.close()
     
     return results_summary
 
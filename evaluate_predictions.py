@@ -0,0 +1,284 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+
+# IoU thresholds 0.5:0.05:0.95 used for mAP@0.5:0.95
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+# Same defaults as ultralytics' ConfusionMatrix
+CONFUSION_CONF = 0.25
+CONFUSION_IOU = 0.45
+# Confidence threshold model.val scores detections at
+VAL_CONF = 0.001
+
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+class DetectionCollector:
+    """Detection sink that keeps every image's detections in memory and forwards those at `conf` to a store"""
+
+    def __init__(self, store=None, conf=None):
+        self.store = store
+        self.conf = conf
+        self.detections = {}
+
+    def write(self, name, detections, shape=(0, 0)):
+        self.detections[name] = (np.array(detections, copy=True), tuple(shape))
+        if self.store is not None:
+            if self.conf is not None:
+                detections = detections[detections[:, 5] >= self.conf]
+            self.store.write(name, detections, shape)
+
+
+def xywh_to_xyxy(boxes):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    xy, half = boxes[:, :2], boxes[:, 2:] / 2
+    return np.concatenate((xy - half, xy + half), axis=1)
+
+
+def box_iou(boxes1, boxes2):
+    """Pairwise IoU of two sets of xyxy boxes, shape (len(boxes1), len(boxes2))"""
+    top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area1 = (boxes1[:, 2:] - boxes1[:, :2]).prod(axis=1)
+    area2 = (boxes2[:, 2:] - boxes2[:, :2]).prod(axis=1)
+    return inter / (area1[:, None] + area2[None, :] - inter + 1e-9)
+
+
+def load_ground_truth(label_path, shape):
+    """Read a normalized YOLO label file as (classes, xyxy boxes in pixels)"""
+    # Background images have empty label files, which np.loadtxt warns about
+    if not os.path.exists(label_path) or os.path.getsize(label_path) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4))
+    labels = np.loadtxt(label_path, ndmin=2)
+    if labels.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4))
+    height, width = shape
+    boxes = labels[:, 1:5] * np.array([width, height, width, height])
+    return labels[:, 0].astype(np.int64), xywh_to_xyxy(boxes)
+
+
+def _greedy_matches(iou, mask):
+    """One-to-one (gt, pred) pairs inside the mask, preferring the highest IoU
+
+    Mirrors ultralytics' confusion matrix: pairs are deduplicated per
+    prediction, then per ground truth box, sorted by IoU before each step.
+    """
+    gt_idx, pred_idx = np.nonzero(mask)
+    if gt_idx.size == 0:
+        return gt_idx, pred_idx
+    order = np.argsort(-iou[gt_idx, pred_idx], kind='stable')
+    gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+    _, keep = np.unique(pred_idx, return_index=True)
+    gt_idx, pred_idx = gt_idx[keep], pred_idx[keep]
+    order = np.argsort(-iou[gt_idx, pred_idx], kind='stable')
+    gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+    _, keep = np.unique(gt_idx, return_index=True)
+    return gt_idx[keep], pred_idx[keep]
+
+
+def match_predictions(pred_cls, gt_cls, iou):
+    """Mark each prediction as a true positive at every IoU threshold, shape (n_pred, 10)
+
+    Predictions are taken in descending confidence order and each claims the
+    unclaimed ground truth box of its class it overlaps most, separately at
+    every threshold, as ultralytics' validator does.
+    """
+    correct = np.zeros((len(pred_cls), len(IOU_THRESHOLDS)), dtype=bool)
+    if len(pred_cls) == 0 or len(gt_cls) == 0:
+        return correct
+    iou = iou * (gt_cls[:, None] == pred_cls[None, :])
+    claimed = np.zeros((len(gt_cls), len(IOU_THRESHOLDS)), dtype=bool)
+    columns = np.arange(len(IOU_THRESHOLDS))
+    for j in np.flatnonzero((iou >= IOU_THRESHOLDS[0]).any(0)):
+        available = np.where(claimed, 0, iou[:, j, None])
+        best = available.argmax(0)
+        correct[j] = available[best, columns] >= IOU_THRESHOLDS
+        claimed[best, columns] |= correct[j]
+    return correct
+
+
+def update_confusion_matrix(matrix, pred_cls, pred_conf, gt_cls, iou):
+    """Accumulate one image into an (nc + 1, nc + 1) predicted x true matrix, last index is background"""
+    nc = matrix.shape[0] - 1
+    keep = pred_conf > CONFUSION_CONF
+    pred_cls, iou = pred_cls[keep], iou[:, keep]
+    gt_idx, pred_idx = _greedy_matches(iou, iou > CONFUSION_IOU)
+    np.add.at(matrix, (pred_cls[pred_idx], gt_cls[gt_idx]), 1)
+    np.add.at(matrix, (nc, np.delete(gt_cls, gt_idx)), 1)
+    np.add.at(matrix, (np.delete(pred_cls, pred_idx), nc), 1)
+
+
+def compute_ap(recall, precision):
+    """Area under the precision envelope with 101 point interpolation (COCO)"""
+    # Precision drops to zero right after the highest recall reached, as in ultralytics
+    mrec = np.concatenate(([0.0], recall, [recall[-1] if len(recall) else 1.0], [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0], [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return _trapezoid(np.interp(x, mrec, mpre), x)
+
+
+def _class_curves(c, tp, conf, pred_cls, n_labels, px):
+    """AP at every IoU threshold and P/R curves over confidence for one class"""
+    mask = pred_cls == c
+    n_pred = mask.sum()
+    ap = np.zeros(tp.shape[1])
+    p_curve, r_curve = np.zeros(len(px)), np.zeros(len(px))
+    if n_pred == 0 or n_labels == 0:
+        return ap, p_curve, r_curve
+    tpc = tp[mask].cumsum(0)
+    fpc = (1 - tp[mask]).cumsum(0)
+    recall = tpc / (n_labels + 1e-16)
+    precision = tpc / (tpc + fpc)
+    # Curves are sampled at the mAP@0.5 column, confidence decreases along the sorted detections
+    r_curve = np.interp(-px, -conf[mask], recall[:, 0], left=0)
+    p_curve = np.interp(-px, -conf[mask], precision[:, 0], left=1)
+    for j in range(tp.shape[1]):
+        ap[j] = compute_ap(recall[:, j], precision[:, j])
+    return ap, p_curve, r_curve
+
+
+def _smooth(y, fraction=0.1):
+    """Box filter of `fraction` of the curve length"""
+    nf = round(len(y) * fraction * 2) // 2 + 1
+    p = np.ones(nf // 2)
+    yp = np.concatenate((p * y[0], y, p * y[-1]))
+    return np.convolve(yp, np.ones(nf) / nf, mode='valid')
+
+
+def ap_per_class(tp, conf, pred_cls, target_cls, nc):
+    """Per class precision, recall and AP, classes evaluated in parallel threads
+
+    Returns the classes that have ground truth boxes and their metrics; like
+    ultralytics, classes without labels do not enter the means.
+    """
+    order = np.argsort(-conf, kind='stable')
+    tp, conf, pred_cls = tp[order].astype(np.float64), conf[order], pred_cls[order]
+    n_labels = np.bincount(target_cls, minlength=nc)
+    classes = np.unique(target_cls)
+    px = np.linspace(0, 1, 1000)
+    with ThreadPoolExecutor(max_workers=max(1, min(len(classes), os.cpu_count() or 1))) as executor:
+        curves = list(executor.map(lambda c: _class_curves(c, tp, conf, pred_cls, n_labels[c], px), classes))
+    ap = np.array([c[0] for c in curves]).reshape(len(classes), tp.shape[1])
+    p_curve = np.array([c[1] for c in curves]).reshape(len(classes), len(px))
+    r_curve = np.array([c[2] for c in curves]).reshape(len(classes), len(px))
+    if len(classes) == 0:
+        return classes, np.zeros(0), np.zeros(0), ap
+    # Report precision and recall at the confidence that maximizes the mean F1
+    f1 = 2 * p_curve * r_curve / (p_curve + r_curve + 1e-16)
+    i = _smooth(f1.mean(0)).argmax()
+    return classes, p_curve[:, i], r_curve[:, i], ap
+
+
+def evaluate_detections(detections, labels_dir, nc, conf_threshold=None):
+    """Compute test metrics from {image name: (detections, (height, width))} against YOLO labels
+
+    Detections are rows [class_id, x_center, y_center, width, height, confidence]
+    in pixels, as written by predict.py. `conf_threshold` is the one they were
+    filtered at, the lowest confidence present when it is not known. mAP only
+    matches model.val's when the detections go down to its conf of 0.001.
+    """
+    tps, confs, pred_classes, target_classes = [], [], [], []
+    confusion = np.zeros((nc + 1, nc + 1), dtype=np.int64)
+    for name, (dets, shape) in detections.items():
+        gt_cls, gt_boxes = load_ground_truth(Path(labels_dir) / (os.path.splitext(name)[0] + '.txt'), shape)
+        dets = np.asarray(dets, dtype=np.float64).reshape(-1, 6)
+        # Matching walks the detections from the most confident one, as NMS outputs them
+        dets = dets[np.argsort(-dets[:, 5], kind='stable')]
+        pred_cls = dets[:, 0].astype(np.int64)
+        iou = box_iou(gt_boxes, xywh_to_xyxy(dets[:, 1:5]))
+        tps.append(match_predictions(pred_cls, gt_cls, iou))
+        confs.append(dets[:, 5])
+        pred_classes.append(pred_cls)
+        target_classes.append(gt_cls)
+        update_confusion_matrix(confusion, pred_cls, dets[:, 5], gt_cls, iou)
+
+    tp = np.concatenate(tps) if tps else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool)
+    conf = np.concatenate(confs) if confs else np.zeros(0)
+    pred_cls = np.concatenate(pred_classes) if pred_classes else np.zeros(0, dtype=np.int64)
+    target_cls = np.concatenate(target_classes) if target_classes else np.zeros(0, dtype=np.int64)
+    if conf_threshold is None:
+        conf_threshold = float(conf.min()) if len(conf) else 0.0
+    classes, precision, recall, ap = ap_per_class(tp, conf, pred_cls, target_cls, nc)
+    per_class = {key: [0.0] * nc for key in ('mAP50', 'mAP50-95', 'Precision', 'Recall')}
+    for i, c in enumerate(classes):
+        per_class['mAP50'][c] = float(ap[i, 0])
+        per_class['mAP50-95'][c] = float(ap[i].mean())
+        per_class['Precision'][c] = float(precision[i])
+        per_class['Recall'][c] = float(recall[i])
+    present = len(classes) > 0
+    return {
+        'mAP50': float(ap[:, 0].mean()) if present else 0.0,
+        'mAP50-95': float(ap.mean()) if present else 0.0,
+        'Precision': float(precision.mean()) if present else 0.0,
+        'Recall': float(recall.mean()) if present else 0.0,
+        'per_class': per_class,
+        'confusion_matrix': confusion.tolist(),
+        'images': len(detections),
+        'conf': conf_threshold,
+    }
+
+
+def print_metrics(metrics, names):
+    print(f"\n{'='*60}")
+    print("TEST METRICS FROM PREDICTIONS")
+    print(f"{'='*60}")
+    print(f"Images: {metrics['images']}")
+    print(f"Detections at conf >= {metrics['conf']:g}")
+    if metrics['conf'] > VAL_CONF:
+        print(f"⚠️ model.val scores detections down to conf {VAL_CONF:g}, "
+              f"so its mAP is typically higher than the mAP below")
+    print(f"mAP@0.5 (conf {metrics['conf']:g}): {metrics['mAP50']:.3f} ({metrics['mAP50']*100:.1f}%)")
+    print(f"mAP@0.5:0.95 (conf {metrics['conf']:g}): {metrics['mAP50-95']:.3f} ({metrics['mAP50-95']*100:.1f}%)")
+    print(f"Precision: {metrics['Precision']:.3f} ({metrics['Precision']*100:.1f}%)")
+    print(f"Recall: {metrics['Recall']:.3f} ({metrics['Recall']*100:.1f}%)")
+    print("\nPer class mAP@0.5:")
+    for name, value in zip(names, metrics['per_class']['mAP50']):
+        print(f"  {name}: {value:.3f}")
+    print("\nConfusion matrix (rows: predicted, columns: true, last: background):")
+    for row in metrics['confusion_matrix']:
+        print("  " + " ".join(f"{v:6d}" for v in row))
+
+
+def compare_with_val(metrics, val_metrics):
+    """Print the metrics next to those of ultralytics' model.val"""
+    reference = {
+        'mAP50': val_metrics.box.map50,
+        'mAP50-95': val_metrics.box.map,
+        'Precision': val_metrics.box.mp,
+        'Recall': val_metrics.box.mr,
+    }
+    print(f"\n{'='*60}")
+    print(f"CHECK AGAINST model.val (predictions at conf {metrics['conf']:g}, model.val at {VAL_CONF:g})")
+    print(f"{'='*60}")
+    for key, value in reference.items():
+        print(f"{key:>10}: predictions {metrics[key]:.4f}  model.val {value:.4f}  diff {metrics[key] - value:+.4f}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import yaml
+    from detection_store import DetectionStoreReader
+
+    parser = argparse.ArgumentParser(description='Compute test metrics from a detection store written by predict.py')
+    parser.add_argument('--store', type=str, default='predictions/detections.bin', help='Detection store path')
+    parser.add_argument('--output', type=str, default=None, help='Save the metrics to this JSON file')
+    parser.add_argument('--conf', type=float, default=None,
+                        help='Confidence threshold the store was written at (default: its lowest confidence)')
+    args = parser.parse_args()
+
+    this_dir = Path(__file__).parent
+    os.chdir(this_dir)
+    with open(this_dir / 'yolo_params.yaml', 'r') as file:
+        data = yaml.safe_load(file)
+    reader = DetectionStoreReader(args.store)
+    detections = {name: (reader.get(name), reader.shape(name)) for name in reader.names()}
+    metrics = evaluate_detections(detections, Path(data['test']) / 'labels', data['nc'], args.conf)
+    print_metrics(metrics, data['names'])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(metrics, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
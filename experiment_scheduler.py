@@ -0,0 +1,308 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from run_utils import format_cores, read_epoch_metrics, split_cores
+
+THIS_DIR = Path(__file__).resolve().parent
+# Written into a run directory stopped early, so a rerun never resumes it
+STOPPED_MARKER = 'STOPPED'
+
+
+def train_args(config):
+    """train.py command line arguments for a hyperparameter config, e.g. {'lr0': 0.001} -> ['--lr0', '0.001']"""
+    args = []
+    for key, value in config.items():
+        args += [f'--{key}', str(value)]
+    return args
+
+
+def config_hash(config):
+    """Short stable hash of a config, it names run directories so a rerun sweep finds its earlier runs"""
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+
+
+def _log_tail(path, lines=20):
+    try:
+        with open(path, 'r', errors='replace') as f:
+            return ''.join(deque(f, maxlen=lines))
+    except OSError:
+        return ''
+
+
+class SuccessiveHalving:
+    """Asynchronous successive halving (ASHA) early stopping for running experiments
+
+    Rungs sit at min_epochs * eta**k epochs. When a run completes a rung its
+    mAP there is recorded, and the run is stopped unless it is in the top
+    1/eta of everything recorded at that rung so far; survivors are promoted,
+    i.e. carry on training towards the next rung. Decisions never wait for
+    other runs, so freed cores go straight to the next queued experiment.
+    """
+
+    def __init__(self, min_epochs=3, eta=3, metric='metrics/mAP50(B)', max_epochs=1000):
+        self.eta = eta
+        self.metric = metric
+        self.rungs = []
+        epoch = min_epochs
+        while epoch < max_epochs:
+            self.rungs.append(epoch)
+            epoch *= eta
+        self.recorded = {rung: [] for rung in self.rungs}
+        # Run directories already recorded at each rung
+        self.recorded_runs = {rung: set() for rung in self.rungs}
+
+    def load_history(self, registry, sweep=None):
+        """Record the rung results of earlier runs in the registry, so a rerun sweep keeps judging against them"""
+        for rung in self.rungs:
+            for run_dir, value in registry.epoch_values(rung, self.metric, sweep):
+                if run_dir not in self.recorded_runs[rung]:
+                    self.recorded_runs[rung].add(run_dir)
+                    self.recorded[rung].append(value)
+        count = sum(len(values) for values in self.recorded.values())
+        if count:
+            print(f"Loaded {count} earlier rung results from the registry")
+
+    def should_stop(self, run):
+        """Rung epoch a running experiment is stopped at, or None to let it continue"""
+        path = os.path.join(run['run_dir'], 'results.csv')
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        # results.csv only changes once per epoch
+        if run.get('results_mtime') == mtime:
+            return None
+        run['results_mtime'] = mtime
+        history = read_epoch_metrics(run['run_dir'], self.metric)
+        rung_results = run.setdefault('rung_results', {})
+        for rung in self.rungs:
+            # The last epoch is the end of the run, not a rung
+            if rung > len(history) or rung >= run['config'].get('epochs', float('inf')):
+                break
+            if rung in rung_results:
+                continue
+            value = history[rung - 1]
+            rung_results[rung] = value
+            if run['run_dir'] in self.recorded_runs[rung]:
+                # A resumed run already passed this rung before it was interrupted
+                continue
+            self.recorded_runs[rung].add(run['run_dir'])
+            recorded = self.recorded[rung]
+            recorded.append(value)
+            cutoff = sorted(recorded, reverse=True)[max(1, len(recorded) // self.eta) - 1]
+            print(f"{'▲' if value >= cutoff else '▼'} {run['name']} epoch {rung}: mAP@0.5 {value:.3f} "
+                  f"(rung cutoff {cutoff:.3f}, {len(recorded)} runs)")
+            if value < cutoff:
+                return rung
+        return None
+
+
+class ExperimentScheduler:
+    """Runs train.py experiments concurrently, each on its own disjoint set of cores
+
+    The cores this process may use are split into `slots` slices (see
+    split_cores). Every experiment runs train.py with its hyperparameters as
+    command line arguments, pinned to a free slice with torch threads and
+    dataloader workers sized to it, into its own run directory. Queued
+    experiments start as soon as a slice frees up, so all cores stay busy
+    until the sweep is done. Finished runs are handed to `on_finish` as they
+    complete. With a `stopper` (see SuccessiveHalving) losing runs are killed
+    early and marked with the `stopped_epoch` they were stopped at.
+
+    With `resume` (the default) a run directory is `project/<name>_<confighash>`,
+    named after its config, and train.py continues it from its last.pt, so
+    rerunning a sweep after a timeout or reboot picks up where every run
+    stopped and skips finished ones; `resumed_epochs` records the epochs that
+    were already done. Runs stopped early stay stopped, and the stopper gets
+    the rung results of earlier runs from the registry. Without `resume` run
+    directories are `project/<name>_<timestamp>_<n>`. Runs that crash are
+    resumed up to `retries` times. A run submitted with `after` waits for that
+    run to succeed, e.g. a shared prefix whose checkpoint it starts from. A
+    `registry` (see run_registry.RunRegistry) receives every run's config,
+    epochs and outcome while the sweep runs.
+    """
+
+    def __init__(self, slots=1, project='runs/sweeps', timeout=72000, poll_interval=1.0, on_finish=None,
+                 stopper=None, resume=True, retries=1, registry=None, sweep=None):
+        self.core_sets = split_cores(slots)
+        self.project = Path(project)
+        if not self.project.is_absolute():
+            self.project = THIS_DIR / self.project
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.on_finish = on_finish
+        self.stopper = stopper
+        self.resume = resume
+        self.retries = retries
+        self.registry = registry
+        self.sweep = sweep or self.project.name
+        self.stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.pending = deque()
+        self.running = []
+        self.finished = []
+        self.submitted = 0
+        if self.stopper and self.registry and self.resume:
+            self.stopper.load_history(self.registry, self.sweep)
+
+    def submit(self, name, config, after=None):
+        """Queue one experiment, optionally behind the run record of another, returns its run record"""
+        self.submitted += 1
+        run_name = f"{name}_{config_hash(config)}" if self.resume else f"{name}_{self.stamp}_{self.submitted}"
+        run = {
+            'name': name,
+            'config': dict(config),
+            'run_name': run_name,
+            'run_dir': str(self.project / run_name),
+            'log_path': str(self.project / f"{run_name}.log"),
+            'after': after,
+        }
+        self.pending.append(run)
+        return run
+
+    def command(self, run, cores):
+        return ([sys.executable, str(THIS_DIR / 'train.py')] + train_args(run['config']) +
+                ['--project', str(self.project), '--name', run['run_name'],
+                 '--threads', str(len(cores)), '--workers', str(min(8, len(cores)))] +
+                (['--resume'] if self.resume else []))
+
+    def last_checkpoint(self, run):
+        return os.path.join(run['run_dir'], 'weights', 'last.pt')
+
+    def stopped_epoch(self, run):
+        """Epoch an earlier attempt of a run was stopped early at, None if it never was"""
+        try:
+            with open(os.path.join(run['run_dir'], STOPPED_MARKER)) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            pass
+        registered = self.registry.run(run['run_dir']) if self.registry else None
+        if registered and registered['status'] == 'stopped':
+            return registered['epochs_done'] or None
+        return None
+
+    def _next_ready(self):
+        """First pending run that is not waiting on another, runs behind a failed one fail right away"""
+        for run in list(self.pending):
+            after = run['after']
+            if after is None or after.get('success'):
+                self.pending.remove(run)
+                stopped_epoch = self.stopped_epoch(run) if self.resume and 'attempts' not in run else None
+                if stopped_epoch:
+                    print(f"✂️ {run['name']} was stopped early at epoch {stopped_epoch}, not resuming it")
+                    run['stopped_epoch'] = stopped_epoch
+                    run['resumed_epochs'] = len(read_epoch_metrics(run['run_dir']))
+                    self._skip(run, f'Stopped early at epoch {stopped_epoch}')
+                    continue
+                return run
+            if after.get('success') is False:
+                self.pending.remove(run)
+                self._skip(run, f"{after['name']} failed")
+        return None
+
+    def _skip(self, run, error):
+        run.update(cores=[], returncode=None, elapsed=0.0, success=False, error=error)
+        run.setdefault('resumed_epochs', 0)
+        self.finished.append(run)
+        if self.on_finish:
+            self.on_finish(run)
+
+    def _launch(self, run, cores):
+        os.makedirs(self.project, exist_ok=True)
+        env = dict(os.environ, OMP_NUM_THREADS=str(len(cores)), MKL_NUM_THREADS=str(len(cores)))
+
+        def pin():
+            if hasattr(os, 'sched_setaffinity'):
+                os.sched_setaffinity(0, cores)
+
+        if 'resumed_epochs' not in run:
+            run['resumed_epochs'] = len(read_epoch_metrics(run['run_dir'])) if self.resume else 0
+            if run['resumed_epochs']:
+                print(f"↻ {run['name']} has {run['resumed_epochs']} epochs in {run['run_dir']}, resuming")
+        run['attempts'] = run.get('attempts', 0) + 1
+        if self.registry:
+            self.registry.start_run(run['run_dir'], run['name'], run['config'], self.sweep)
+        run['log_file'] = open(run['log_path'], 'a')
+        run['process'] = subprocess.Popen(self.command(run, cores), cwd=THIS_DIR, env=env, stdout=run['log_file'],
+                                          stderr=subprocess.STDOUT, preexec_fn=pin)
+        run['cores'] = cores
+        run['start'] = time.time()
+        self.running.append(run)
+        print(f"▶ Started {run['name']} on cores {format_cores(cores)} -> {run['run_dir']}")
+
+    def _finish(self, run, error=None):
+        process = run.pop('process')
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        run.pop('log_file').close()
+        self.running.remove(run)
+        elapsed = run.get('elapsed', 0.0) + time.time() - run['start']
+        if (error is None and process.returncode != 0 and self.resume and run['attempts'] <= self.retries
+                and os.path.exists(self.last_checkpoint(run))):
+            print(f"↻ {run['name']} exited with {process.returncode}, resuming from its last checkpoint")
+            run['elapsed'] = elapsed
+            self.pending.appendleft(run)
+            return
+        run['returncode'] = process.returncode
+        run['elapsed'] = elapsed
+        run['success'] = error is None and process.returncode == 0
+        run['error'] = error if error else (None if run['success'] else _log_tail(run['log_path']))
+        if run.get('stopped_epoch'):
+            with open(os.path.join(run['run_dir'], STOPPED_MARKER), 'w') as f:
+                f.write(f"{run['stopped_epoch']}\n")
+        if self.registry:
+            status = 'finished' if run['success'] else ('stopped' if run.get('stopped_epoch') else 'failed')
+            self.registry.finish_run(run['run_dir'], status, run['elapsed'] / 3600, run['error'])
+        self.finished.append(run)
+        if self.on_finish:
+            self.on_finish(run)
+
+    def poll(self):
+        """Reap finished, timed out or early stopped runs, returns the core sets they freed"""
+        freed = []
+        for run in list(self.running):
+            if self.registry:
+                self.registry.sync(run['run_dir'])
+            if run['process'].poll() is not None:
+                self._finish(run)
+            elif time.time() - run['start'] > self.timeout:
+                self._finish(run, 'Training timeout')
+            else:
+                # Runs others start from always finish
+                needed = any(waiting['after'] is run for waiting in self.pending)
+                stopped_epoch = self.stopper.should_stop(run) if self.stopper and not needed else None
+                if stopped_epoch is None:
+                    continue
+                run['stopped_epoch'] = stopped_epoch
+                self._finish(run, f'Stopped early at epoch {stopped_epoch}')
+            freed.append(run['cores'])
+        return freed
+
+    def run(self):
+        """Run every queued experiment, returns the finished run records in completion order"""
+        free = list(self.core_sets)
+        print(f"Scheduling {len(self.pending)} experiments on {len(free)} slots of "
+              f"{', '.join(format_cores(cores) for cores in free)}")
+        try:
+            while self.pending or self.running:
+                while free:
+                    run = self._next_ready()
+                    if run is None:
+                        break
+                    self._launch(run, free.pop(0))
+                if self.pending and not self.running:
+                    # Waiting on runs that were never submitted here
+                    while self.pending:
+                        self._skip(self.pending.popleft(), 'Dependency never ran')
+                time.sleep(self.poll_interval)
+                free += self.poll()
+        finally:
+            for run in list(self.running):
+                self._finish(run, 'Interrupted')
+        return self.finished
@@ -0,0 +1,175 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import cv2
+import numpy as np
+
+IMAGE_SUFFIXES = ['.png', '.jpg', '.jpeg', '.bmp']
+
+
+def image_cache_path(images_dir, imgsz):
+    """Cache file of one image directory at one training size, e.g. data/train/images_640.imgcache"""
+    images_dir = Path(images_dir)
+    return images_dir.parent / f"{images_dir.name}_{imgsz}.imgcache"
+
+
+def list_images(images_dir):
+    return sorted(p for p in Path(images_dir).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def load_resized(path, imgsz, augment=True):
+    """Decode an image and resize its long side to imgsz exactly like ultralytics' BaseDataset.load_image"""
+    im = cv2.imread(str(path))
+    if im is None:
+        raise FileNotFoundError(f"Image not found or unreadable: {path}")
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        interpolation = cv2.INTER_LINEAR if (augment or r > 1) else cv2.INTER_AREA
+        im = cv2.resize(im, (w, h), interpolation=interpolation)
+    return np.ascontiguousarray(im), (h0, w0)
+
+
+def is_fresh(cache_path, images_dir):
+    """True when the cache exists, covers the same files and is newer than all of them"""
+    index_path = str(cache_path) + '.idx'
+    if not os.path.exists(index_path):
+        return False
+    images = list_images(images_dir)
+    with open(index_path, 'r') as f:
+        names = [line.split('\t', 1)[0] for line in f]
+    if names != [p.name for p in images]:
+        return False
+    built = os.path.getmtime(index_path)
+    return all(p.stat().st_mtime <= built for p in images)
+
+
+def build_image_cache(images_dir, imgsz=640, augment=True, cache_path=None, workers=None):
+    """Decode and resize every image of a directory once into one uint8 file with an offset index
+
+    `cache_path` holds the BGR pixels of every image back to back and
+    `cache_path.idx` one `name offset height width height0 width0` line per
+    image. Both are written to temporary files and renamed into place, so
+    concurrent experiments never see a half written cache.
+    """
+    cache_path = Path(cache_path or image_cache_path(images_dir, imgsz))
+    images = list_images(images_dir)
+    tmp_data, tmp_index = f"{cache_path}.{os.getpid()}.tmp", f"{cache_path}.idx.{os.getpid()}.tmp"
+    offset = 0
+    # cv2 releases the GIL while decoding, so threads decode in parallel
+    with ThreadPoolExecutor(workers or os.cpu_count()) as pool, \
+            open(tmp_data, 'wb') as data_file, open(tmp_index, 'w') as index_file:
+        for path, (im, (h0, w0)) in zip(images, pool.map(lambda p: load_resized(p, imgsz, augment), images)):
+            data_file.write(im.tobytes())
+            index_file.write(f"{path.name}\t{offset}\t{im.shape[0]}\t{im.shape[1]}\t{h0}\t{w0}\n")
+            offset += im.nbytes
+    os.replace(tmp_data, cache_path)
+    os.replace(tmp_index, str(cache_path) + '.idx')
+    return cache_path, len(images), offset
+
+
+class ImageCache:
+    """Zero-copy reader for a file written by build_image_cache
+
+    The pixels are a copy-on-write memory map, so every dataloader worker and
+    every concurrent experiment reading the same cache shares its pages
+    through the OS page cache; get() returns a view into the map and in-place
+    augmentations only ever touch a private copy of the pages they write.
+    The map is reopened lazily after pickling, so spawned workers never copy it.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.index = {}
+        with open(self.path + '.idx', 'r') as f:
+            for line in f:
+                name, offset, height, width, height0, width0 = line.rstrip('\n').split('\t')
+                self.index[name] = (int(offset), (int(height), int(width)), (int(height0), int(width0)))
+        self.data = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['data'] = None
+        return state
+
+    def get(self, name):
+        """(image view, (height0, width0)) of one cached image"""
+        if self.data is None:
+            self.data = np.memmap(self.path, dtype=np.uint8, mode='c')
+        offset, (height, width), original_shape = self.index[name]
+        im = self.data[offset:offset + height * width * 3].reshape(height, width, 3)
+        return im, original_shape
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+
+class CachedLoadImage:
+    """Drop-in replacement for a dataset's load_image that serves images from an ImageCache
+
+    Keeps ultralytics' mosaic buffer bookkeeping and falls back to the
+    dataset's own loader for images that are not in the cache.
+    """
+
+    def __init__(self, dataset, cache):
+        self.dataset = dataset
+        self.cache = cache
+
+    def __call__(self, i, rect_mode=True):
+        dataset = self.dataset
+        if dataset.ims[i] is not None:
+            return dataset.ims[i], dataset.im_hw0[i], dataset.im_hw[i]
+        name = os.path.basename(dataset.im_files[i])
+        if not rect_mode or name not in self.cache:
+            return type(dataset).load_image(dataset, i, rect_mode)
+        im, (h0, w0) = self.cache.get(name)
+        if dataset.augment:
+            dataset.ims[i], dataset.im_hw0[i], dataset.im_hw[i] = im, (h0, w0), im.shape[:2]
+            dataset.buffer.append(i)
+            if 1 < len(dataset.buffer) >= dataset.max_buffer_length:
+                j = dataset.buffer.pop(0)
+                if dataset.cache != 'ram':
+                    dataset.ims[j], dataset.im_hw0[j], dataset.im_hw[j] = None, None, None
+        return im, (h0, w0), im.shape[:2]
+
+
+def cached_trainer():
+    """DetectionTrainer whose datasets read images from memory mapped caches, built on first use"""
+    from ultralytics.models.yolo.detect import DetectionTrainer
+
+    class CachedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode='train', batch=None):
+            dataset = super().build_dataset(img_path, mode, batch)
+            if not os.path.isdir(img_path):
+                return dataset  # image lists and txt files are read as usual
+            augment = mode == 'train'
+            cache_path = image_cache_path(img_path, self.args.imgsz)
+            if not is_fresh(cache_path, img_path):
+                print(f"Building image cache {cache_path}...")
+                build_image_cache(img_path, self.args.imgsz, augment, cache_path)
+            dataset.load_image = CachedLoadImage(dataset, ImageCache(cache_path))
+            return dataset
+
+    return CachedDetectionTrainer
+
+
+if __name__ == '__main__':
+    import argparse
+    import yaml
+    parser = argparse.ArgumentParser(description='Pre-decode the training and validation images into memory mapped caches')
+    parser.add_argument('--imgsz', type=int, default=640, help='Training image size')
+    parser.add_argument('--workers', type=int, default=None, help='Decode threads (default: all cores)')
+    args = parser.parse_args()
+
+    this_dir = Path(__file__).parent
+    os.chdir(this_dir)
+    with open(this_dir / 'yolo_params.yaml', 'r') as file:
+        data = yaml.safe_load(file)
+    for split in ['train', 'val']:
+        path, count, size = build_image_cache(data[split], args.imgsz, split == 'train', workers=args.workers)
+        print(f"{split}: {count} images, {size / 2**20:.0f} MB -> {path}")
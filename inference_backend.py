@@ -0,0 +1,72 @@
+import os
+from pathlib import Path
+import numpy as np
+
+# Inference backends every model loader in the project can select
+BACKENDS = ['torch', 'onnx', 'onnx-int8', 'openvino']
+
+
+def export_model(model_path, backend, imgsz=640):
+    """Export the weights to the backend's format once, cached next to the weights
+
+    The artifact is reused while it is newer than the weights and re-exported
+    after the weights change. Exports use dynamic shapes so one artifact serves
+    every batch size and image size.
+    """
+    model_path = Path(model_path)
+    if backend == 'onnx':
+        artifact = model_path.with_suffix('.onnx')
+    elif backend == 'onnx-int8':
+        # Only quantize_model.py publishes this artifact, after its accuracy gate
+        artifact = model_path.with_name(f"{model_path.stem}_int8.onnx")
+        if not artifact.exists():
+            raise FileNotFoundError(f"{artifact} not found, run quantize_model.py to publish a quantized model")
+        return artifact
+    elif backend == 'openvino':
+        artifact = model_path.parent / f"{model_path.stem}_openvino_model"
+    else:
+        raise ValueError(f"Backend {backend} has no export format, choose from {BACKENDS[1:]}")
+    if artifact.exists() and artifact.stat().st_mtime >= model_path.stat().st_mtime:
+        return artifact
+
+    from ultralytics import YOLO
+    print(f"Exporting {model_path} to {backend}...")
+    exported = YOLO(str(model_path)).export(format=backend, imgsz=imgsz, dynamic=True)
+    return Path(exported)
+
+
+def _onnx_session(path, threads):
+    """ONNX Runtime session tuned for CPU inference"""
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.enable_mem_pattern = True
+    options.enable_cpu_mem_arena = True
+    return ort.InferenceSession(str(path), sess_options=options, providers=['CPUExecutionProvider'])
+
+
+def load_model(model_path, backend='torch', imgsz=640, threads=None):
+    """Load YOLO weights for inference on the selected backend
+
+    'torch' runs the .pt weights eagerly. 'onnx' and 'openvino' export the
+    weights once (see export_model) and 'onnx-int8' loads the model published
+    by quantize_model.py; all of them run through ultralytics' own backend
+    wrapper, so the returned model keeps the YOLO predict/val API.
+    """
+    from ultralytics import YOLO
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend}, choose from {BACKENDS}")
+    if backend == 'torch':
+        return YOLO(str(model_path))
+
+    artifact = export_model(model_path, backend, imgsz)
+    model = YOLO(str(artifact), task='detect')
+    # Warm up once so the predictor and its runtime session exist
+    model.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), imgsz=imgsz, verbose=False)
+    if backend in ('onnx', 'onnx-int8'):
+        # Replace ultralytics' default session with one tuned for this CPU
+        model.predictor.model.session = _onnx_session(artifact, threads or os.cpu_count() or 1)
+    return model
@@ -1,103 +1,148 @@
+import argparse
 import os
-import subprocess
 import json
 import time
 from datetime import datetime
+from experiment_scheduler import ExperimentScheduler, SuccessiveHalving
+from run_utils import format_cores
+from run_registry import DEFAULT_REGISTRY, RunRegistry
 
 class IterativeTrainer:
-    def __init__(self):
+    def __init__(self, parallel=1, project='runs/sweeps', asha=False, min_epochs=3, eta=3, resume=True,
+                 shared_prefix=0, registry_path=DEFAULT_REGISTRY):
         self.experiments = []
         self.best_mAP = 0.0
         self.best_config = None
+        self.parallel = parallel
+        self.project = project
+        # Successive halving stops losing configs at epochs min_epochs * eta**k
+        self.asha = asha
+        self.min_epochs = min_epochs
+        self.eta = eta
+        # Runs continue from their last.pt, and with a shared prefix configs that differ only in their
+        # epochs branch from one checkpoint of shared_prefix epochs trained with their settings
+        self.resume = resume
+        self.shared_prefix = shared_prefix
+        self.prefix_records = []
+        # Configs, per-epoch metrics and outcomes of every run, kept current while runs train
+        self.registry = RunRegistry(registry_path)
         
     def run_experiment(self, config_name, **kwargs):
         """Run a training experiment with given configuration"""
+        return self.run_experiments([{'name': config_name, **kwargs}])[0]
+
+    def prefix_groups(self, experiments):
+        """Configs that can share a prefix, keyed by every hyperparameter but epochs
+
+        Only configs that train their first shared_prefix epochs with the same optimizer, learning rate
+        schedule and augmentation share them; groups of one have nothing to share and train from scratch.
+        """
+        groups = {}
+        for exp in experiments:
+            if exp.get('epochs', 0) > self.shared_prefix:
+                settings = {key: value for key, value in exp.items() if key not in ('name', 'epochs')}
+                groups.setdefault(json.dumps(settings, sort_keys=True), []).append(exp['name'])
+        return {key: names for key, names in groups.items() if len(names) > 1}
+
+    def run_experiments(self, experiments):
+        """Run experiments concurrently, each with its own cores and run directory"""
+        stopper = SuccessiveHalving(self.min_epochs, self.eta) if self.asha else None
+        scheduler = ExperimentScheduler(self.parallel, self.project, timeout=72000,  # 20 hour timeout
+                                        on_finish=self.record_experiment, stopper=stopper, resume=self.resume,
+                                        registry=self.registry, sweep='iterative')
+        prefixes = {}
+        if self.shared_prefix:
+            for key, names in self.prefix_groups(experiments).items():
+                prefix = scheduler.submit('Shared_Prefix', dict(json.loads(key), epochs=self.shared_prefix))
+                prefix.update(shared_prefix=True, branches=names)
+                for name in names:
+                    prefixes[name] = prefix
+        runs = []
+        for exp in experiments:
+            config = {key: value for key, value in exp.items() if key != 'name'}
+            prefix = prefixes.get(exp['name'])
+            if prefix:
+                # The branch trains the remaining epochs with the same settings on top of the prefix checkpoint
+                branch = dict(config, epochs=config['epochs'] - self.shared_prefix,
+                              weights=scheduler.last_checkpoint(prefix))
+                run = scheduler.submit(exp['name'], branch, after=prefix)
+                run['prefix'] = prefix
+            else:
+                run = scheduler.submit(exp['name'], config)
+            runs.append(run)
+        scheduler.run()
+        # In submission order, runs that never started have no record
+        return [run['record'] for run in runs if 'record' in run]
+
+    def record_experiment(self, run):
+        """Record a finished run, called by the scheduler as runs complete"""
+        config_name = run['name']
+        registered = self.registry.run(run['run_dir'])
+        epochs_trained = (registered['epochs_done'] if registered else 0) - run['resumed_epochs']
+        if run.get('shared_prefix'):
+            self.prefix_records.append({
+                'run_dir': run['run_dir'],
+                'config': run['config'],
+                'branches': run['branches'],
+                'success': run['success'],
+                'epochs_trained': epochs_trained,
+                'error': run['error']
+            })
+            print(f"{'✅' if run['success'] else '❌'} Shared prefix of {run['config']['epochs']} epochs for "
+                  f"{', '.join(run['branches'])} {'ready' if run['success'] else 'failed'}: {run['run_dir']}")
+            self.save_experiments()
+            return
+
         print(f"\n{'='*60}")
-        print(f"RUNNING EXPERIMENT: {config_name}")
+        cores = f" (cores {format_cores(run['cores'])})" if run['cores'] else ''
+        print(f"EXPERIMENT FINISHED: {config_name}{cores}")
         print(f"{'='*60}")
-        
-        # Create experiment config
+
         experiment_config = {
             'name': config_name,
             'timestamp': datetime.now().isoformat(),
-            'config': kwargs
+            'config': run['config'],
+            'run_dir': run['run_dir'],
+            'success': run['success'],
+            'training_time': run['elapsed'] / 3600,
+            'epochs_trained': epochs_trained,
+            # Epochs taken from checkpoints instead of trained: earlier attempts plus the shared prefix
+            'epochs_reused': run['resumed_epochs'] + (run['prefix']['config']['epochs'] if 'prefix' in run else 0)
         }
-        
-        # Modify train.py for this experiment
-        self.modify_train_script(**kwargs)
-        
-        # Run training
-        start_time = time.time()
-        try:
-            result = subprocess.run(['python', 'train.py'], 
-                                  capture_output=True, text=True, timeout=72000)  # 20 hour timeout
-            
-            if result.returncode == 0:
-                # Extract results
-                metrics = self.extract_metrics()
-                experiment_config['metrics'] = metrics
-                experiment_config['success'] = True
-                experiment_config['training_time'] = (time.time() - start_time) / 3600
-                
-                # Update best model
-                if metrics['mAP50'] > self.best_mAP:
-                    self.best_mAP = metrics['mAP50']
-                    self.best_config = config_name
-                    
-                print(f"✅ Experiment {config_name} completed successfully!")
-                print(f"   mAP@0.5: {metrics['mAP50']:.3f} ({metrics['mAP50']*100:.1f}%)")
-                print(f"   Training time: {experiment_config['training_time']:.2f} hours")
-                
-            else:
-                experiment_config['success'] = False
-                experiment_config['error'] = result.stderr
-                print(f"❌ Experiment {config_name} failed!")
-                print(f"Error: {result.stderr}")
-                
-        except subprocess.TimeoutExpired:
-            experiment_config['success'] = False
-            experiment_config['error'] = 'Training timeout'
+        if 'prefix' in run:
+            # A branch is a fresh training run on the prefix checkpoint, its lineage is both configs
+            experiment_config['prefix'] = {'config': run['prefix']['config'], 'run_dir': run['prefix']['run_dir']}
+        if run.get('stopped_epoch'):
+            # Partial metrics are kept for reference but never compete for best
+            experiment_config['metrics'] = self.registry.metrics(run['run_dir'])
+            experiment_config['stopped_epoch'] = run['stopped_epoch']
+            experiment_config['error'] = run['error']
+            print(f"✂️ Experiment {config_name} stopped early at epoch {run['stopped_epoch']}")
+            print(f"   mAP@0.5: {experiment_config['metrics']['mAP50']:.3f} at the rung")
+        elif run['success']:
+            # Extract results
+            metrics = self.registry.metrics(run['run_dir'])
+            experiment_config['metrics'] = metrics
+
+            # Update best model
+            if metrics['mAP50'] > self.best_mAP:
+                self.best_mAP = metrics['mAP50']
+                self.best_config = config_name
+
+            print(f"✅ Experiment {config_name} completed successfully!")
+            print(f"   mAP@0.5: {metrics['mAP50']:.3f} ({metrics['mAP50']*100:.1f}%)")
+            print(f"   Training time: {experiment_config['training_time']:.2f} hours")
+        elif run['error'] == 'Training timeout':
+            experiment_config['error'] = run['error']
             print(f"⏰ Experiment {config_name} timed out!")
-            
+        else:
+            experiment_config['error'] = run['error']
+            print(f"❌ Experiment {config_name} failed!")
+            print(f"Error: {run['error']}")
+
+        run['record'] = experiment_config
         self.experiments.append(experiment_config)
         self.save_experiments()
-        
-        return experiment_config
-    
-    def modify_train_script(self, **kwargs):
-        """Modify train.py with new parameters"""
-        with open('train.py', 'r') as f:
-            content = f.read()
-        
-        # Update parameters
-        for key, value in kwargs.items():
-            if key == 'epochs':
-                content = content.replace('EPOCHS = 5', f'EPOCHS = {value}')
-            elif key == 'mosaic':
-                content = content.replace('MOSAIC = 0.1', f'MOSAIC = {value}')
-            elif key == 'optimizer':
-                content = content.replace("OPTIMIZER = 'AdamW'", f"OPTIMIZER = '{value}'")
-            elif key == 'lr0':
-                content = content.replace('LR0 = 0.001', f'LR0 = {value}')
-            elif key == 'momentum':
-                content = content.replace('MOMENTUM = 0.2', f'MOMENTUM = {value}')
-        
-        with open('train.py', 'w') as f:
-            f.write(content)
-    
-    def extract_metrics(self):
-        """Extract metrics from the latest training run"""
-        try:
-            import pandas as pd
-            df = pd.read_csv('runs/detect/train/results.csv')
-            return {
-                'mAP50': df['metrics/mAP50(B)'].iloc[-1],
-                'mAP50-95': df['metrics/mAP50-95(B)'].iloc[-1],
-                'Precision': df['metrics/precision(B)'].iloc[-1],
-                'Recall': df['metrics/recall(B)'].iloc[-1]
-            }
-        except:
-            return {'mAP50': 0.0, 'mAP50-95': 0.0, 'Precision': 0.0, 'Recall': 0.0}
     
     def save_experiments(self):
         """Save experiment results"""
@@ -105,7 +150,8 @@ class IterativeTrainer:
             json.dump({
                 'experiments': self.experiments,
                 'best_mAP': self.best_mAP,
-                'best_config': self.best_config
+                'best_config': self.best_config,
+                'shared_prefixes': self.prefix_records
             }, f, indent=2)
     
     def run_optimization_experiments(self):
@@ -146,14 +192,17 @@ class IterativeTrainer:
         ]
         
         print("Starting iterative optimization experiments...")
-        print(f"Total experiments to run: {len(experiments)}")
+        print(f"Total experiments to run: {len(experiments)}, {self.parallel} at a time")
+        if self.asha:
+            print(f"Successive halving: rungs every x{self.eta} epochs from epoch {self.min_epochs}")
+        if self.shared_prefix:
+            groups = self.prefix_groups(experiments)
+            print(f"Shared prefix: {len(groups)} group(s) of configs branch from a {self.shared_prefix} epoch "
+                  f"checkpoint trained with their settings, the others train from scratch")
         
-        for i, exp in enumerate(experiments, 1):
-            print(f"\nProgress: {i}/{len(experiments)}")
-            self.run_experiment(**exp)
-            
-            # Brief pause between experiments
-            time.sleep(5)
+        start_time = time.time()
+        self.run_experiments(experiments)
+        print(f"\nSweep wall time: {(time.time() - start_time) / 3600:.2f} hours")
         
         self.print_final_summary()
     
@@ -175,9 +224,44 @@ class IterativeTrainer:
                       f"({exp['metrics']['mAP50']*100:.1f}%)")
         else:
             print("No successful experiments completed.")
+
+        stopped_experiments = [exp for exp in self.experiments if exp.get('stopped_epoch')]
+        if stopped_experiments:
+            print(f"\nStopped Early:")
+            for exp in stopped_experiments:
+                print(f"  {exp['name']}: epoch {exp['stopped_epoch']}/{exp['config'].get('epochs')}, "
+                      f"mAP@0.5 = {exp['metrics']['mAP50']:.3f}")
+
+        trained = sum(exp['epochs_trained'] for exp in self.experiments)
+        reused = sum(exp['epochs_reused'] for exp in self.experiments)
+        trained += sum(prefix['epochs_trained'] for prefix in self.prefix_records)
+        budget = sum(exp['config'].get('epochs', 0) + exp.get('prefix', {}).get('config', {}).get('epochs', 0)
+                     for exp in self.experiments)
+        if budget and trained < budget:
+            print(f"\nEpochs trained: {trained} of {budget} ({(1 - trained / budget) * 100:.0f}% saved, "
+                  f"{reused} reused from checkpoints)")
         
         print(f"\nDetailed results saved to: experiment_results.json")
+        print(f"Query all runs with: python run_registry.py best --sweep iterative")
 
 if __name__ == "__main__":
-    trainer = IterativeTrainer()
+    parser = argparse.ArgumentParser(description='Run the hyperparameter experiments')
+    # concurrent experiments, the cores are split evenly between them
+    parser.add_argument('--parallel', type=int, default=max(1, min(4, (os.cpu_count() or 1) // 4)),
+                        help='Experiments run at the same time, each pinned to its own cores')
+    parser.add_argument('--project', type=str, default='runs/sweeps', help='Directory of the run directories')
+    # successive halving (ASHA) early stopping
+    parser.add_argument('--asha', action='store_true', help='Stop configs that fall behind at rung epochs')
+    parser.add_argument('--min-epochs', type=int, default=3, help='First rung epoch')
+    parser.add_argument('--eta', type=int, default=3, help='Rung spacing factor, the top 1/eta survive each rung')
+    # checkpoint reuse
+    parser.add_argument('--no-resume', action='store_true',
+                        help='Start every run from scratch instead of continuing its last.pt')
+    parser.add_argument('--shared-prefix', type=int, default=0,
+                        help='Train this many epochs once per group of configs that differ only in epochs, '
+                             'and branch the group from there')
+    args = parser.parse_args()
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    trainer = IterativeTrainer(args.parallel, args.project, args.asha, args.min_epochs, args.eta,
+                               not args.no_resume, args.shared_prefix)
     trainer.run_optimization_experiments() 
\ No newline at end of file
@@ -1,78 +1,84 @@
+import argparse
 import os
-import subprocess
 import json
 import time
 from datetime import datetime
+from experiment_scheduler import ExperimentScheduler, SuccessiveHalving
+from run_registry import RunRegistry
+
+def experiment_result(run, registry):
+    """optimization_results.json record of a finished scheduler run"""
+    exp_name = run['name']
+    training_time = run['elapsed'] / 3600
+    registered = registry.run(run['run_dir'])
+    result = {
+        'name': exp_name,
+        'success': run['success'],
+        'config': run['config'],
+        'run_dir': run['run_dir'],
+        'training_time': training_time,
+        'epochs_trained': (registered['epochs_done'] if registered else 0) - run['resumed_epochs'],
+        # Epochs an earlier, interrupted attempt already trained
+        'epochs_reused': run['resumed_epochs']
+    }
+    if run.get('stopped_epoch'):
+        result['metrics'] = registry.metrics(run['run_dir'])
+        result['stopped_epoch'] = run['stopped_epoch']
+        result['error'] = run['error']
+        print(f"✂️ Experiment {exp_name} stopped early at epoch {run['stopped_epoch']}")
+    elif run['success']:
+        metrics = registry.metrics(run['run_dir'])
+        result['metrics'] = metrics
+        print(f"✅ Experiment {exp_name} completed successfully!")
+        print(f"   mAP@0.5: {metrics['mAP50']:.3f} ({metrics['mAP50']*100:.1f}%)")
+        print(f"   Training time: {training_time:.2f} hours")
+    elif run['error'] == 'Training timeout':
+        result['error'] = 'Timeout'
+        print(f"⏰ Experiment {exp_name} timed out!")
+    else:
+        result['error'] = run['error']
+        print(f"❌ Experiment {exp_name} failed!")
+    return result
+
+def run_optimization_experiments(experiments, parallel=1, stopper=None, on_result=None):
+    """Run experiments concurrently on disjoint core sets, returns their results in completion order"""
+    results = []
+    registry = RunRegistry()
+
+    def finished(run):
+        results.append(experiment_result(run, registry))
+        if on_result:
+            on_result(results)
+
+    scheduler = ExperimentScheduler(parallel, 'runs/optimize', timeout=36000,  # 10 hour timeout
+                                    on_finish=finished, stopper=stopper, registry=registry, sweep='optimize')
+    for exp in experiments:
+        scheduler.submit(exp['name'], {key: value for key, value in exp.items() if key != 'name'})
+    scheduler.run()
+    registry.close()
+    return results
 
 def run_optimization_experiment(exp_name, epochs=30, mosaic=0.5, optimizer='AdamW', lr0=0.001):
     """Run a single optimization experiment"""
     print(f"\n{'='*60}")
     print(f"RUNNING EXPERIMENT: {exp_name}")
     print(f"{'='*60}")
-    
-    # Create backup of original train.py
-    if not os.path.exists('train.py.backup'):
-        os.system('copy train.py train.py.backup')
-    
-    # Modify train.py for this experiment
-    with open('train.py', 'r') as f:
-        content = f.read()
-    
-    # Update parameters
-    content = content.replace('EPOCHS = 5', f'EPOCHS = {epochs}')
-    content = content.replace('MOSAIC = 0.1', f'MOSAIC = {mosaic}')
-    content = content.replace("OPTIMIZER = 'AdamW'", f"OPTIMIZER = '{optimizer}'")
-    content = content.replace('LR0 = 0.001', f'LR0 = {lr0}')
-    
-    with open('train.py', 'w') as f:
-        f.write(content)
-    
-    # Run training
-    start_time = time.time()
-    try:
-        result = subprocess.run(['python', 'train.py'], 
-                              capture_output=True, text=True, timeout=36000)  # 10 hour timeout
-        
-        if result.returncode == 0:
-            # Extract metrics
-            metrics = extract_metrics()
-            training_time = (time.time() - start_time) / 3600
-            
-            print(f"✅ Experiment {exp_name} completed successfully!")
-            print(f"   mAP@0.5: {metrics['mAP50']:.3f} ({metrics['mAP50']*100:.1f}%)")
-            print(f"   Training time: {training_time:.2f} hours")
-            
-            return {
-                'name': exp_name,
-                'success': True,
-                'metrics': metrics,
-                'training_time': training_time,
-                'config': {'epochs': epochs, 'mosaic': mosaic, 'optimizer': optimizer, 'lr0': lr0}
-            }
-        else:
-            print(f"❌ Experiment {exp_name} failed!")
-            return {'name': exp_name, 'success': False, 'error': result.stderr}
-            
-    except subprocess.TimeoutExpired:
-        print(f"⏰ Experiment {exp_name} timed out!")
-        return {'name': exp_name, 'success': False, 'error': 'Timeout'}
-
-def extract_metrics():
-    """Extract metrics from the latest training run"""
-    try:
-        import pandas as pd
-        df = pd.read_csv('runs/detect/train/results.csv')
-        return {
-            'mAP50': df['metrics/mAP50(B)'].iloc[-1],
-            'mAP50-95': df['metrics/mAP50-95(B)'].iloc[-1],
-            'Precision': df['metrics/precision(B)'].iloc[-1],
-            'Recall': df['metrics/recall(B)'].iloc[-1]
-        }
-    except:
-        return {'mAP50': 0.0, 'mAP50-95': 0.0, 'Precision': 0.0, 'Recall': 0.0}
+    experiment = {'name': exp_name, 'epochs': epochs, 'mosaic': mosaic, 'optimizer': optimizer, 'lr0': lr0}
+    return run_optimization_experiments([experiment])[0]
 
 def main():
     """Run optimization experiments"""
+    parser = argparse.ArgumentParser(description='Run the optimization experiments')
+    # concurrent experiments, the cores are split evenly between them
+    parser.add_argument('--parallel', type=int, default=max(1, min(4, (os.cpu_count() or 1) // 4)),
+                        help='Experiments run at the same time, each pinned to its own cores')
+    # successive halving (ASHA) early stopping
+    parser.add_argument('--asha', action='store_true', help='Stop configs that fall behind at rung epochs')
+    parser.add_argument('--min-epochs', type=int, default=3, help='First rung epoch')
+    parser.add_argument('--eta', type=int, default=3, help='Rung spacing factor, the top 1/eta survive each rung')
+    args = parser.parse_args()
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
     experiments = [
         {'name': 'Extended_Baseline', 'epochs': 50, 'mosaic': 0.1, 'optimizer': 'AdamW', 'lr0': 0.001},
         {'name': 'High_Mosaic', 'epochs': 30, 'mosaic': 0.7, 'optimizer': 'AdamW', 'lr0': 0.001},
@@ -80,21 +86,20 @@ def main():
         {'name': 'SGD_Optimizer', 'epochs': 30, 'mosaic': 0.1, 'optimizer': 'SGD', 'lr0': 0.01}
     ]
     
-    results = []
     best_mAP = 0.0
     best_config = None
     
     print("Starting optimization experiments...")
-    print(f"Total experiments: {len(experiments)}")
-    
-    for i, exp in enumerate(experiments, 1):
-        print(f"\nProgress: {i}/{len(experiments)}")
-        result = run_optimization_experiment(**exp)
-        results.append(result)
-        
+    print(f"Total experiments: {len(experiments)}, {args.parallel} at a time")
+
+    def save_progress(results):
+        nonlocal best_mAP, best_config
+        result = results[-1]
+        print(f"\nProgress: {len(results)}/{len(experiments)}")
+        # Early stopped runs only have partial metrics and never count as best
         if result['success'] and result['metrics']['mAP50'] > best_mAP:
             best_mAP = result['metrics']['mAP50']
-            best_config = exp['name']
+            best_config = result['name']
         
         # Save progress
         with open('optimization_results.json', 'w') as f:
@@ -103,8 +108,10 @@ def main():
                 'best_mAP': best_mAP,
                 'best_config': best_config
             }, f, indent=2)
-        
-        time.sleep(5)  # Brief pause between experiments
+
+    stopper = SuccessiveHalving(args.min_epochs, args.eta) if args.asha else None
+    start_time = time.time()
+    results = run_optimization_experiments(experiments, args.parallel, stopper, save_progress)
     
     # Print final summary
     print(f"\n{'='*60}")
@@ -122,8 +129,19 @@ def main():
                   f"({result['metrics']['mAP50']*100:.1f}%)")
     else:
         print("No successful experiments completed.")
+
+    stopped = [r for r in results if r.get('stopped_epoch')]
+    if stopped:
+        print(f"\nStopped early: {', '.join(r['name'] for r in stopped)}")
+    trained = sum(r['epochs_trained'] for r in results)
+    budget = sum(r['config'].get('epochs', 0) for r in results)
+    if budget and trained < budget:
+        print(f"Epochs trained: {trained} of {budget} ({(1 - trained / budget) * 100:.0f}% saved, "
+              f"{sum(r['epochs_reused'] for r in results)} reused from checkpoints)")
+    print(f"Sweep wall time: {(time.time() - start_time) / 3600:.2f} hours")
     
     print(f"\nResults saved to: optimization_results.json")
+    print(f"Query all runs with: python run_registry.py best --sweep optimize")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,33 +1,123 @@
-from ultralytics import YOLO
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import cv2
 import os
 import yaml
+from prediction_pipeline import PredictionPipeline
+from detection_store import DetectionStoreWriter, result_to_detections, write_yolo_txt
+from prediction_cache import PredictionCache, CachingStore
+from render_predictions import draw_detections
+from sharded_predict import predict_sharded
+from inference_backend import BACKENDS, load_model
+from evaluate_predictions import VAL_CONF, DetectionCollector, evaluate_detections, print_metrics, compare_with_val
+
+CONF = 0.5
+IMGSZ = 640
+BATCH = 1
+
+
+# Function to save one prediction result (annotated image + detections)
+def save_result(result, output_path, output_path_txt, render=True, store=None, output_conf=None):
+    # Extract class ids, boxes and confidences from the result tensors in one go
+    detections = result_to_detections(result)
+    if store is not None:
+        # Every detection the model returned, the sink decides what it keeps
+        store.write(Path(output_path).name, detections, result.orig_shape)
+    if output_conf is not None:
+        # Inference ran below the output threshold for scoring, draw and write only the confident boxes
+        result = result[result.boxes.conf >= output_conf]
+        detections = detections[detections[:, 5] >= output_conf]
+    if render:
+        # Draw boxes on the image
+        img = result.plot()  # Plots the predictions directly on the image
+
+        # Save the result
+        cv2.imwrite(str(output_path), img)
+    if output_path_txt is not None:
+        # Write bbox information in the format [class_id, x_center, y_center, width, height]
+        write_yolo_txt(output_path_txt, detections)
+
+
+# Function to save detections served from the prediction cache
+def save_cached(image_path, output_path, output_path_txt, detections, shape, names, render=True, store=None,
+                output_conf=None):
+    if store is not None:
+        store.write(Path(output_path).name, detections, shape)
+    if output_conf is not None:
+        detections = detections[detections[:, 5] >= output_conf]
+    if render:
+        img = cv2.imread(str(image_path))
+        if img is not None:
+            draw_detections(img, detections, names)
+            cv2.imwrite(str(output_path), img)
+    if output_path_txt is not None:
+        write_yolo_txt(output_path_txt, detections)
 
 
 # Function to predict and save images
-def predict_and_save(model, image_path, output_path, output_path_txt):
+def predict_and_save(model, image_path, output_path, output_path_txt, conf=CONF, imgsz=IMGSZ, render=True, store=None,
+                     output_conf=None):
     # Perform prediction
-    results = model.predict(image_path,conf=0.5)
+    results = model.predict(image_path, conf=conf, imgsz=imgsz)
+    save_result(results[0], output_path, output_path_txt, render=render, store=store, output_conf=output_conf)
 
-    result = results[0]
-    # Draw boxes on the image
-    img = result.plot()  # Plots the predictions directly on the image
 
-    # Save the result
-    cv2.imwrite(str(output_path), img)
-    # Save the bounding box data
-    with open(output_path_txt, 'w') as f:
-        for box in result.boxes:
-            # Extract the class id and bounding box coordinates
-            cls_id = int(box.cls)
-            x_center, y_center, width, height = box.xywh[0].tolist()
-            
-            # Write bbox information in the format [class_id, x_center, y_center, width, height]
-            f.write(f"{cls_id} {x_center} {y_center} {width} {height}\n")
+# Function to predict a list of images in batches and save each result
+def predict_batch_and_save(model, image_paths, output_paths, output_paths_txt, conf=CONF, imgsz=IMGSZ, batch_size=16,
+                           render=True, store=None, output_conf=None):
+    for start in range(0, len(image_paths), batch_size):
+        stop = start + batch_size
+        images, outputs = [], []
+        for image_path, output_path, output_path_txt in zip(image_paths[start:stop], output_paths[start:stop], output_paths_txt[start:stop]):
+            image = cv2.imread(str(image_path))
+            if image is None:
+                print(f"Failed to read image {image_path}, skipping")
+                continue
+            images.append(image)
+            outputs.append((output_path, output_path_txt))
+        if not images:
+            continue
+        # A list of decoded arrays is preprocessed and run as a single batch
+        results = model.predict(images, conf=conf, imgsz=imgsz, batch=len(images), verbose=False)
+        # Fan the results back out to the per-image writers
+        for result, (output_path, output_path_txt) in zip(results, outputs):
+            save_result(result, output_path, output_path_txt, render=render, store=store, output_conf=output_conf)
 
 
 if __name__ == '__main__': 
+    parser = argparse.ArgumentParser()
+    # batch size (1 predicts image by image)
+    parser.add_argument('--batch', type=int, default=BATCH, help='Number of images per forward pass')
+    # image size
+    parser.add_argument('--imgsz', type=int, default=IMGSZ, help='Inference image size')
+    # confidence threshold
+    parser.add_argument('--conf', type=float, default=CONF, help='Confidence threshold')
+    # label-only output, render later with render_predictions.py
+    parser.add_argument('--no-render', action='store_true', help='Only write labels, skip annotated images')
+    # label output: YOLO txt files, a single detection store, or both
+    parser.add_argument('--labels-format', type=str, default='txt', choices=['txt', 'store', 'both'],
+                        help='Write one txt file per image, a single indexed detection store, or both')
+    parser.add_argument('--store-path', type=str, default='predictions/detections.bin', help='Detection store path')
+    # persistent prediction cache, reruns only infer new or changed images
+    parser.add_argument('--cache', type=str, default=None, help='Prediction cache file, e.g. predictions/cache.sqlite')
+    parser.add_argument('--cache-size-mb', type=int, default=1024, help='Evict least recently used entries past this size')
+    # multi-process sharding, each worker pinned to its own slice of cores
+    parser.add_argument('--workers', type=int, default=1, help='Prediction processes (1 runs in this process)')
+    # inference backend, onnx/openvino are exported once and cached next to the weights
+    parser.add_argument('--backend', type=str, default='torch', choices=BACKENDS, help='Inference backend')
+    parser.add_argument('--threads', type=int, default=None, help='CPU threads of the onnx backend (default: all)')
+    # re-run model.val on the test split and compare it with the metrics computed from the predictions
+    parser.add_argument('--check-val', action='store_true', help='Cross-check the metrics against model.val')
+    # streaming decode -> infer -> write pipeline
+    parser.add_argument('--pipeline', action='store_true', help='Overlap decoding and writing with inference')
+    parser.add_argument('--decode-workers', type=int, default=4, help='Decode threads in pipeline mode')
+    parser.add_argument('--write-workers', type=int, default=4, help='Writer threads in pipeline mode')
+    parser.add_argument('--queue-size', type=int, default=64, help='Bound of each pipeline queue')
+    args = parser.parse_args()
+    if args.pipeline and args.workers > 1:
+        parser.error("--pipeline runs in this process, it cannot be combined with --workers > 1")
 
     this_dir = Path(__file__).parent
     os.chdir(this_dir)
@@ -73,7 +163,7 @@ if __name__ == '__main__':
         idx = choice
 
     model_path = detect_path / train_folders[idx] / "weights" / "best.pt"
-    model = YOLO(model_path)
+    model = load_model(model_path, args.backend, imgsz=args.imgsz, threads=args.threads)
 
     # Directory with images
     output_dir = this_dir / "predictions" # Replace with the directory where you want to save predictions
@@ -85,16 +175,79 @@ if __name__ == '__main__':
     images_output_dir.mkdir(parents=True, exist_ok=True)
     labels_output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Iterate through the images in the directory
-    for img_path in images_dir.glob('*'):
-        if img_path.suffix not in ['.png', '.jpg']:
-            continue
-        output_path_img = images_output_dir / img_path.name  # Save image in 'images' folder
-        output_path_txt = labels_output_dir / img_path.with_suffix('.txt').name  # Save label in 'labels' folder
-        predict_and_save(model, img_path, output_path_img, output_path_txt)
+    # Collect the images in the directory
+    img_paths = sorted(p for p in images_dir.glob('*') if p.suffix in ['.png', '.jpg'])
+    output_paths_img = [images_output_dir / p.name for p in img_paths]  # Save image in 'images' folder
+    if args.labels_format == 'store':
+        output_paths_txt = [None] * len(img_paths)
+    else:
+        output_paths_txt = [labels_output_dir / p.with_suffix('.txt').name for p in img_paths]  # Save label in 'labels' folder
+    store = DetectionStoreWriter(args.store_path) if args.labels_format != 'txt' else None
+    # Inference runs at model.val's conf so the test metrics score the full detection list; images,
+    # label files and the store only get the detections at --conf
+    collector = DetectionCollector(store, conf=args.conf)
+    sink = collector
+
+    cache = None
+    if args.cache:
+        cache = PredictionCache(args.cache, model_path, {'conf': VAL_CONF, 'imgsz': args.imgsz, 'backend': args.backend},
+                                max_bytes=args.cache_size_mb * 2**20)
+        with ThreadPoolExecutor(max_workers=args.decode_workers) as executor:
+            keys = list(executor.map(cache.key, img_paths))
+        # Serve hits straight from the cache, only the misses go through the model
+        misses = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is None:
+                misses.append(i)
+                continue
+            save_cached(img_paths[i], output_paths_img[i], output_paths_txt[i], *cached, model.names,
+                        render=not args.no_render, store=sink, output_conf=args.conf)
+        sink = CachingStore(cache, {output_paths_img[i].name: keys[i] for i in misses}, collector)
+        img_paths = [img_paths[i] for i in misses]
+        output_paths_img = [output_paths_img[i] for i in misses]
+        output_paths_txt = [output_paths_txt[i] for i in misses]
+
+    if args.workers > 1:
+        predict_sharded(model_path, img_paths, output_paths_img, output_paths_txt, args.workers, store=sink,
+                        backend=args.backend, conf=VAL_CONF, imgsz=args.imgsz, batch_size=max(args.batch, 1), render=not args.no_render,
+                        part_dir=output_dir, output_conf=args.conf)
+    elif args.pipeline:
+        save_fn = functools.partial(save_result, render=not args.no_render, store=sink, output_conf=args.conf)
+        pipeline = PredictionPipeline(model, save_fn, conf=VAL_CONF, imgsz=args.imgsz, batch_size=args.batch,
+                                      decode_workers=args.decode_workers, write_workers=args.write_workers,
+                                      queue_size=args.queue_size)
+        pipeline.run(list(zip(img_paths, output_paths_img, output_paths_txt)))
+        pipeline.print_report()
+    elif args.batch > 1:
+        predict_batch_and_save(model, img_paths, output_paths_img, output_paths_txt,
+                               conf=VAL_CONF, imgsz=args.imgsz, batch_size=args.batch, render=not args.no_render,
+                               store=sink, output_conf=args.conf)
+    else:
+        for img_path, output_path_img, output_path_txt in zip(img_paths, output_paths_img, output_paths_txt):
+            predict_and_save(model, img_path, output_path_img, output_path_txt, conf=VAL_CONF, imgsz=args.imgsz,
+                             render=not args.no_render, store=sink, output_conf=args.conf)
+    if store is not None:
+        store.close()
+    if cache is not None:
+        cache.evict()
+        cache.print_report()
+        cache.close()
 
-    print(f"Predicted images saved in {images_output_dir}")
-    print(f"Bounding box labels saved in {labels_output_dir}")
+    if args.no_render:
+        print("Rendering skipped, draw a subset later with render_predictions.py")
+    else:
+        print(f"Predicted images saved in {images_output_dir}")
+    if store is not None:
+        print(f"Detections saved in {args.store_path}")
+    if args.labels_format != 'store':
+        print(f"Bounding box labels saved in {labels_output_dir}")
+    params = data
     data = this_dir / 'yolo_params.yaml'
     print(f"Model parameters saved in {data}")
-    metrics = model.val(data=data, split="test")
+    # Score the detections the loop just produced instead of running inference over the test split again
+    metrics = evaluate_detections(collector.detections, Path(params['test']) / 'labels', params['nc'], VAL_CONF)
+    print_metrics(metrics, params['names'])
+    if args.check_val:
+        val_metrics = model.val(data=data, split="test", imgsz=args.imgsz)
+        compare_with_val(metrics, val_metrics)
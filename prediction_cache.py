@@ -0,0 +1,127 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import numpy as np
+from detection_store import DETECTION_COLUMNS, DETECTION_DTYPE
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """Persistent content-addressed cache of raw detections
+
+    Entries are keyed by (image content hash, weights hash, inference settings),
+    so renamed or copied images still hit and any change of weights, conf or
+    imgsz misses. The cache lives in one SQLite file and is trimmed to
+    `max_bytes` by evicting the least recently used entries.
+    """
+
+    def __init__(self, path, weights_path, settings, max_bytes=1 << 30, commit_every=256):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self.prefix = f"{file_digest(weights_path)}:{json.dumps(settings, sort_keys=True)}"
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, height INTEGER, width INTEGER, data BLOB, size INTEGER, last_used REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.conn.commit()
+
+    def key(self, image_path):
+        """Cache key of an image under the current weights and settings"""
+        return hashlib.sha256(f"{self.prefix}:{file_digest(image_path)}".encode()).hexdigest()
+
+    def get(self, key):
+        """Return (detections, (height, width)) for a key, or None on a miss"""
+        with self.lock:
+            row = self.conn.execute("SELECT height, width, data FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._maybe_commit()
+        height, width, data = row
+        detections = np.frombuffer(data, dtype=DETECTION_DTYPE).reshape(-1, len(DETECTION_COLUMNS))
+        return detections, (height, width)
+
+    def put(self, key, detections, shape):
+        data = np.ascontiguousarray(detections, dtype=DETECTION_DTYPE).tobytes()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, height, width, data, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, int(shape[0]), int(shape[1]), data, len(data) + len(key), time.time()),
+            )
+            self._maybe_commit()
+
+    def _maybe_commit(self):
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.conn.commit()
+            self.pending = 0
+
+    def size(self):
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        with self.lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            stale = []
+            for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+            self.conn.commit()
+            self.evicted += len(stale)
+            return len(stale)
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def print_report(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        print(f"\n{'='*60}")
+        print("PREDICTION CACHE")
+        print(f"{'='*60}")
+        print(f"Hits: {self.hits}  Misses: {self.misses}  Hit rate: {hit_rate:.1f}%")
+        print(f"Evicted: {self.evicted}  Size: {self.size() / 2**20:.1f} MB / {self.max_bytes / 2**20:.0f} MB")
+
+
+class CachingStore:
+    """Detection sink that records fresh detections in the cache and forwards them to a store"""
+
+    def __init__(self, cache, keys, store=None):
+        self.cache = cache
+        self.keys = keys
+        self.store = store
+
+    def write(self, name, detections, shape=(0, 0)):
+        self.cache.put(self.keys[name], detections, shape)
+        if self.store is not None:
+            self.store.write(name, detections, shape)
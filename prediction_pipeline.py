@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+import cv2
+
+# Marker put on a queue when an upstream worker has no more items
+_DONE = object()
+
+
+class StageStats:
+    """Busy time and item count of one pipeline stage"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.count = 0
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, count, seconds):
+        with self.lock:
+            self.count += count
+            self.busy += seconds
+
+    def throughput(self):
+        """Images per second the stage sustains with all of its workers busy"""
+        if self.busy == 0:
+            return 0.0
+        return self.count * self.workers / self.busy
+
+
+class PredictionPipeline:
+    """Streams images through decode -> infer -> write stages connected by bounded queues
+
+    Decoding and writing run in thread pools so disk and codec time overlap with
+    the forward pass, which runs on the calling thread.
+    """
+
+    def __init__(self, model, save_fn, conf=0.5, imgsz=640, batch_size=8,
+                 decode_workers=4, write_workers=4, queue_size=64):
+        self.model = model
+        self.save_fn = save_fn
+        self.conf = conf
+        self.imgsz = imgsz
+        self.batch_size = batch_size
+        self.decode_workers = decode_workers
+        self.write_workers = write_workers
+        self.queue_size = queue_size
+        self.stats = {}
+        self.error = None
+        self.wall_time = 0.0
+
+    def run(self, jobs):
+        """Run (image_path, output_path, output_path_txt) jobs through the pipeline"""
+        self.stats = {
+            'decode': StageStats('decode', self.decode_workers),
+            'infer': StageStats('infer', 1),
+            'write': StageStats('write', self.write_workers),
+        }
+        self.error = None
+        job_queue = queue.Queue()
+        for job in jobs:
+            job_queue.put(job)
+        decoded_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+
+        decoders = [threading.Thread(target=self._decode_worker, args=(job_queue, decoded_queue), daemon=True)
+                    for _ in range(self.decode_workers)]
+        writers = [threading.Thread(target=self._write_worker, args=(write_queue,), daemon=True)
+                   for _ in range(self.write_workers)]
+        start_time = time.perf_counter()
+        for thread in decoders + writers:
+            thread.start()
+
+        try:
+            self._infer_stage(decoded_queue, write_queue)
+        except BaseException:
+            # Unblock the decoders so they can exit before re-raising
+            try:
+                while True:
+                    job_queue.get_nowait()
+            except queue.Empty:
+                pass
+            while any(thread.is_alive() for thread in decoders):
+                try:
+                    decoded_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            raise
+        finally:
+            for _ in writers:
+                write_queue.put(_DONE)
+            for thread in decoders + writers:
+                thread.join()
+        self.wall_time = time.perf_counter() - start_time
+
+        if self.error is not None:
+            raise self.error
+        return self.stats
+
+    def _decode_worker(self, job_queue, decoded_queue):
+        try:
+            # Stop early once any stage failed, run() raises the error
+            while self.error is None:
+                try:
+                    job = job_queue.get_nowait()
+                except queue.Empty:
+                    break
+                start = time.perf_counter()
+                image = cv2.imread(str(job[0]))
+                self.stats['decode'].add(1, time.perf_counter() - start)
+                if image is None:
+                    print(f"Failed to read image {job[0]}, skipping")
+                    continue
+                decoded_queue.put((image, job))
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+        finally:
+            # The inference stage counts these to know when decoding is over
+            decoded_queue.put(_DONE)
+
+    def _infer_stage(self, decoded_queue, write_queue):
+        remaining_decoders = self.decode_workers
+        while remaining_decoders:
+            # Block for the first image, then top the batch up with whatever is ready
+            batch = []
+            item = decoded_queue.get()
+            while True:
+                if item is _DONE:
+                    remaining_decoders -= 1
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size or not remaining_decoders:
+                    break
+                try:
+                    item = decoded_queue.get_nowait()
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            results = self.model.predict([image for image, _ in batch], conf=self.conf, imgsz=self.imgsz,
+                                         batch=len(batch), verbose=False)
+            self.stats['infer'].add(len(batch), time.perf_counter() - start)
+            for result, (_, job) in zip(results, batch):
+                write_queue.put((result, job))
+
+    def _write_worker(self, write_queue):
+        while True:
+            item = write_queue.get()
+            if item is _DONE:
+                break
+            result, (_, output_path, output_path_txt) = item
+            start = time.perf_counter()
+            try:
+                self.save_fn(result, output_path, output_path_txt)
+            except Exception as e:
+                # Keep draining so the inference stage never blocks on a full queue
+                if self.error is None:
+                    self.error = e
+            self.stats['write'].add(1, time.perf_counter() - start)
+
+    def print_report(self):
+        """Print per-stage throughput of the last run"""
+        print(f"\n{'='*60}")
+        print("PIPELINE THROUGHPUT")
+        print(f"{'='*60}")
+        for stage in self.stats.values():
+            print(f"{stage.name:>7}: {stage.count} images, {stage.busy:.2f} s busy "
+                  f"across {stage.workers} worker(s), {stage.throughput():.1f} img/s")
+        processed = self.stats['write'].count
+        if self.wall_time > 0:
+            print(f"{'overall':>7}: {processed} images in {self.wall_time:.2f} s, "
+                  f"{processed / self.wall_time:.1f} img/s")
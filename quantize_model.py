@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+import cv2
+import numpy as np
+import yaml
+from inference_backend import export_model
+
+IMGSZ = 640
+CALIBRATION_IMAGES = 200
+MAX_MAP50_DROP = 0.02
+
+
+def letterbox(image, imgsz=IMGSZ, color=(114, 114, 114)):
+    """Resize keeping the aspect ratio and pad to a square, as YOLO preprocessing does"""
+    h, w = image.shape[:2]
+    ratio = min(imgsz / h, imgsz / w)
+    new_w, new_h = round(w * ratio), round(h * ratio)
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top = (imgsz - new_h) // 2
+    left = (imgsz - new_w) // 2
+    return cv2.copyMakeBorder(resized, top, imgsz - new_h - top, left, imgsz - new_w - left,
+                              cv2.BORDER_CONSTANT, value=color)
+
+
+def to_input(image, imgsz=IMGSZ):
+    """BGR image to a 1x3xHxW float32 RGB tensor in [0, 1]"""
+    image = letterbox(image, imgsz)[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(image, dtype=np.float32)[None] / 255.0
+
+
+def sample_images(images_dir, count, seed=0):
+    paths = sorted(p for p in Path(images_dir).glob('*') if p.suffix in ['.png', '.jpg'])
+    random.Random(seed).shuffle(paths)
+    return paths[:count]
+
+
+class ImageCalibrationReader:
+    """Feeds letterboxed training images to ONNX Runtime's static calibration"""
+
+    def __init__(self, image_paths, input_name, imgsz=IMGSZ):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self.index = 0
+
+    def get_next(self):
+        while self.index < len(self.image_paths):
+            image = cv2.imread(str(self.image_paths[self.index]))
+            self.index += 1
+            if image is not None:
+                return {self.input_name: to_input(image, self.imgsz)}
+        return None
+
+    def rewind(self):
+        self.index = 0
+
+
+def head_nodes_to_exclude(model_path):
+    """Keep the box decoding of the Detect head in float, only its convolutions are quantized"""
+    import onnx
+    model = onnx.load(str(model_path))
+    return [node.name for node in model.graph.node
+            if node.name.startswith('/model.22/') and node.op_type != 'Conv']
+
+
+def quantize(fp32_path, int8_path, calibration_paths, imgsz=IMGSZ):
+    """Static INT8 post-training quantization of an ONNX model"""
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    prepared_path = Path(int8_path).with_suffix('.prep.onnx')
+    quant_pre_process(str(fp32_path), str(prepared_path))
+    input_name = ort.InferenceSession(str(prepared_path), providers=['CPUExecutionProvider']).get_inputs()[0].name
+    reader = ImageCalibrationReader(calibration_paths, input_name, imgsz)
+    quantize_static(
+        str(prepared_path), str(int8_path), reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=head_nodes_to_exclude(prepared_path),
+    )
+    os.remove(prepared_path)
+
+    # Carry over the class names and stride ultralytics reads from the model metadata
+    fp32_model = onnx.load(str(fp32_path))
+    int8_model = onnx.load(str(int8_path))
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, str(int8_path))
+
+
+def measure_latency(model_path, image_paths, imgsz=IMGSZ, warmup=5):
+    """Mean and p95 single image latency in ms of an ONNX model on the CPU"""
+    import onnxruntime as ort
+    session = ort.InferenceSession(str(model_path), providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    inputs = [to_input(image, imgsz) for image in (cv2.imread(str(p)) for p in image_paths) if image is not None]
+    for x in inputs[:warmup]:
+        session.run(None, {input_name: x})
+    times = []
+    for x in inputs:
+        start = time.perf_counter()
+        session.run(None, {input_name: x})
+        times.append((time.perf_counter() - start) * 1000)
+    return {'mean_ms': float(np.mean(times)), 'p95_ms': float(np.percentile(times, 95))}
+
+
+def evaluate(model_path, data_path, imgsz=IMGSZ):
+    """mAP of a model on the test split"""
+    from ultralytics import YOLO
+    metrics = YOLO(str(model_path), task='detect').val(data=str(data_path), split='test', imgsz=imgsz)
+    return {'mAP50': float(metrics.box.map50), 'mAP50-95': float(metrics.box.map)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='INT8 post-training quantization with an accuracy gate')
+    parser.add_argument('--weights', type=str, default='runs/detect/train/weights/best.pt', help='Weights to quantize')
+    parser.add_argument('--imgsz', type=int, default=IMGSZ, help='Calibration and evaluation image size')
+    parser.add_argument('--calibration-images', type=int, default=CALIBRATION_IMAGES,
+                        help='Number of training images used for calibration')
+    parser.add_argument('--max-drop', type=float, default=MAX_MAP50_DROP,
+                        help='Largest allowed mAP@0.5 drop below baseline_results.json')
+    parser.add_argument('--latency-images', type=int, default=50, help='Test images used to measure latency')
+    args = parser.parse_args()
+
+    this_dir = Path(__file__).parent
+    os.chdir(this_dir)
+    data_path = this_dir / 'yolo_params.yaml'
+    with open(data_path, 'r') as file:
+        data = yaml.safe_load(file)
+    with open('baseline_results.json', 'r') as f:
+        baseline = json.load(f)['metrics']
+
+    weights = Path(args.weights)
+    if not weights.exists():
+        print(f"Weights {weights} not found, please train the model first")
+        exit(1)
+    fp32_path = export_model(weights, 'onnx', args.imgsz)
+    candidate_path = weights.with_name(f"{weights.stem}_int8.candidate.onnx")
+    published_path = weights.with_name(f"{weights.stem}_int8.onnx")
+
+    calibration_paths = sample_images(data['train'], args.calibration_images)
+    print(f"Calibrating on {len(calibration_paths)} images from {data['train']}...")
+    quantize(fp32_path, candidate_path, calibration_paths, args.imgsz)
+
+    latency_paths = sample_images(Path(data['test']) / 'images', args.latency_images)
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'weights': str(weights),
+        'calibration_images': len(calibration_paths),
+        'baseline': {'mAP50': baseline['mAP50'], 'mAP50-95': baseline['mAP50-95']},
+        'fp32': {**evaluate(fp32_path, data_path, args.imgsz), **measure_latency(fp32_path, latency_paths, args.imgsz)},
+        'int8': {**evaluate(candidate_path, data_path, args.imgsz),
+                 **measure_latency(candidate_path, latency_paths, args.imgsz)},
+        'max_drop': args.max_drop,
+    }
+    fp32, int8 = results['fp32'], results['int8']
+
+    print(f"\n{'='*60}")
+    print("INT8 QUANTIZATION RESULTS")
+    print(f"{'='*60}")
+    print(f"Baseline mAP@0.5: {baseline['mAP50']:.3f}")
+    print(f"FP32: mAP@0.5 {fp32['mAP50']:.3f}  mAP@0.5:0.95 {fp32['mAP50-95']:.3f}  "
+          f"latency {fp32['mean_ms']:.1f} ms (p95 {fp32['p95_ms']:.1f} ms)")
+    print(f"INT8: mAP@0.5 {int8['mAP50']:.3f}  mAP@0.5:0.95 {int8['mAP50-95']:.3f}  "
+          f"latency {int8['mean_ms']:.1f} ms (p95 {int8['p95_ms']:.1f} ms)")
+    print(f"Speedup: {fp32['mean_ms'] / int8['mean_ms']:.2f}x")
+
+    # Accuracy gate: never publish a model that fell too far below the recorded baseline
+    results['published'] = int8['mAP50'] >= baseline['mAP50'] - args.max_drop
+    if results['published']:
+        shutil.move(str(candidate_path), str(published_path))
+        results['model'] = str(published_path)
+        print(f"✅ Accuracy gate passed, quantized model published to {published_path}")
+    else:
+        results['model'] = str(candidate_path)
+        print(f"❌ Accuracy gate failed: mAP@0.5 {int8['mAP50']:.3f} is more than {args.max_drop:.3f} "
+              f"below the baseline {baseline['mAP50']:.3f}. Candidate kept at {candidate_path}, not published.")
+
+    with open('quantization_results.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: quantization_results.json")
+    if not results['published']:
+        exit(1)
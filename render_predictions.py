@@ -0,0 +1,89 @@
+import argparse
+from pathlib import Path
+import cv2
+import os
+import yaml
+from detection_store import DetectionStoreReader
+
+
+# Function to read a predicted label file [class_id, x_center, y_center, width, height] in pixels
+def read_labels(label_path):
+    detections = []
+    with open(label_path, 'r') as f:
+        for line in f.read().splitlines():
+            if not line.strip():
+                continue
+            cls_id, x_center, y_center, width, height = map(float, line.split()[:5])
+            detections.append((int(cls_id), x_center, y_center, width, height))
+    return detections
+
+
+# Function to draw detections on an image
+def draw_detections(image, detections, names, color=(0, 255, 0)):
+    for det in detections:
+        cls_id, x_center, y_center, width, height = int(det[0]), *det[1:5]
+        x1 = int(x_center - width / 2)
+        y1 = int(y_center - height / 2)
+        x2 = int(x_center + width / 2)
+        y2 = int(y_center + height / 2)
+        label = names[cls_id] if 0 <= cls_id < len(names) else str(cls_id)
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(image, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+    return image
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Draw stored predictions on a subset of the test images')
+    # images to render, by file name or stem
+    parser.add_argument('images', nargs='*', help='Image names to render (default: all)')
+    parser.add_argument('--pattern', type=str, default='*', help='Glob pattern over the image names')
+    parser.add_argument('--limit', type=int, default=None, help='Render at most this many images')
+    parser.add_argument('--labels-dir', type=str, default='predictions/labels', help='Predicted labels directory')
+    parser.add_argument('--store', type=str, default=None, help='Read detections from this detection store instead')
+    parser.add_argument('--output-dir', type=str, default='predictions/images', help='Rendered images directory')
+    args = parser.parse_args()
+
+    this_dir = Path(__file__).parent
+    os.chdir(this_dir)
+    with open(this_dir / 'yolo_params.yaml', 'r') as file:
+        data = yaml.safe_load(file)
+    if 'test' not in data or data['test'] is None:
+        print("No test field found in yolo_params.yaml, please add the test field with the path to the test images")
+        exit()
+    images_dir = Path(data['test']) / 'images'
+    names = data['names']
+
+    labels_dir = Path(args.labels_dir)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    img_paths = sorted(p for p in images_dir.glob(args.pattern) if p.suffix in ['.png', '.jpg'])
+    if args.images:
+        wanted = set(args.images)
+        img_paths = [p for p in img_paths if p.name in wanted or p.stem in wanted]
+    if args.limit is not None:
+        img_paths = img_paths[:args.limit]
+
+    store = DetectionStoreReader(args.store) if args.store else None
+    rendered = 0
+    for img_path in img_paths:
+        label_path = labels_dir / img_path.with_suffix('.txt').name
+        if store is not None:
+            if img_path.name not in store:
+                print(f"No predictions for {img_path.name}, skipping")
+                continue
+            detections = store.get(img_path.name)
+        elif label_path.exists():
+            detections = read_labels(label_path)
+        else:
+            print(f"No predictions for {img_path.name}, skipping")
+            continue
+        image = cv2.imread(str(img_path))
+        if image is None:
+            print(f"Failed to read image {img_path}, skipping")
+            continue
+        draw_detections(image, detections, names)
+        cv2.imwrite(str(output_dir / img_path.name), image)
+        rendered += 1
+
+    print(f"Rendered {rendered} images to {output_dir}")
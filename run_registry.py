@@ -0,0 +1,367 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+import numpy as np
+from run_utils import read_results
+
+THIS_DIR = Path(__file__).resolve().parent
+DEFAULT_REGISTRY = THIS_DIR / 'runs' / 'registry.sqlite'
+
+# results.csv column -> column of the epochs table
+EPOCH_COLUMNS = {
+    'metrics/mAP50(B)': 'mAP50',
+    'metrics/mAP50-95(B)': 'mAP50_95',
+    'metrics/precision(B)': 'precision',
+    'metrics/recall(B)': 'recall',
+    'time': 'seconds',
+}
+# Sortable run metrics, named as in the experiment JSON files where they exist
+METRICS = {'mAP50': 'mAP50', 'mAP50-95': 'mAP50_95', 'Precision': 'precision', 'Recall': 'recall',
+           'best_mAP50': 'best_mAP50', 'latency_ms': 'latency_ms', 'training_time': 'training_time'}
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs ("
+    "id INTEGER PRIMARY KEY, run_dir TEXT UNIQUE NOT NULL, name TEXT, sweep TEXT, status TEXT, config TEXT, "
+    "started REAL, finished REAL, training_time REAL, epochs INTEGER, epochs_done INTEGER DEFAULT 0, "
+    "mAP50 REAL, mAP50_95 REAL, precision REAL, recall REAL, best_mAP50 REAL, weights TEXT, "
+    "latency_ms REAL, latency_p95_ms REAL, error TEXT)",
+    "CREATE TABLE IF NOT EXISTS params ("
+    "run_id INTEGER NOT NULL, key TEXT NOT NULL, value TEXT, number REAL, PRIMARY KEY (run_id, key))",
+    "CREATE TABLE IF NOT EXISTS epochs ("
+    "run_id INTEGER NOT NULL, epoch INTEGER NOT NULL, mAP50 REAL, mAP50_95 REAL, precision REAL, recall REAL, "
+    "seconds REAL, PRIMARY KEY (run_id, epoch))",
+    "CREATE INDEX IF NOT EXISTS runs_mAP50 ON runs (mAP50)",
+    "CREATE INDEX IF NOT EXISTS runs_latency ON runs (latency_ms, mAP50)",
+    "CREATE INDEX IF NOT EXISTS runs_status ON runs (status, sweep)",
+    "CREATE INDEX IF NOT EXISTS params_number ON params (key, number)",
+    "CREATE INDEX IF NOT EXISTS params_value ON params (key, value)",
+]
+
+
+def _number(value):
+    """Numeric value of a hyperparameter for range and equality lookups, None for text"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RunRegistry:
+    """SQLite registry of training runs, their configs and per-epoch metrics
+
+    A run is keyed by its run directory. start_run() records its config, one
+    indexed params row per hyperparameter, sync() ingests the epochs that were
+    added to its results.csv since the last call and finish_run() closes it,
+    so the registry is current while sweeps are still training and queries
+    like best() never touch a CSV.
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.mtimes = {}
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    def _run_id(self, run_dir, name=None, sweep=None):
+        run_dir = str(run_dir)
+        self.conn.execute("INSERT OR IGNORE INTO runs (run_dir, name, sweep) VALUES (?, ?, ?)",
+                          (run_dir, name or os.path.basename(run_dir), sweep))
+        return self.conn.execute("SELECT id FROM runs WHERE run_dir = ?", (run_dir,)).fetchone()[0]
+
+    def _set_params(self, run_id, config):
+        self.conn.execute("DELETE FROM params WHERE run_id = ?", (run_id,))
+        self.conn.executemany("INSERT INTO params (run_id, key, value, number) VALUES (?, ?, ?, ?)",
+                              [(run_id, key, str(value), _number(value)) for key, value in config.items()])
+
+    def start_run(self, run_dir, name, config, sweep=None):
+        """Register a run that is about to train, a resumed run keeps its epochs"""
+        with self.lock:
+            run_id = self._run_id(run_dir, name, sweep)
+            self.conn.execute(
+                "UPDATE runs SET name = ?, sweep = ?, status = 'running', config = ?, epochs = ?, "
+                "started = COALESCE(started, ?), finished = NULL, error = NULL WHERE id = ?",
+                (name, sweep, json.dumps(config, sort_keys=True), config.get('epochs'), time.time(), run_id),
+            )
+            self._set_params(run_id, config)
+            self.conn.commit()
+        self.mtimes.pop(str(run_dir), None)
+        self.sync(run_dir)
+
+    def sync(self, run_dir):
+        """Ingest the epochs added to a run's results.csv since the last sync, returns how many"""
+        run_dir = str(run_dir)
+        try:
+            mtime = os.path.getmtime(os.path.join(run_dir, 'results.csv'))
+        except OSError:
+            return 0
+        if self.mtimes.get(run_dir) == mtime:
+            return 0
+        self.mtimes[run_dir] = mtime
+        rows = read_results(run_dir)
+        with self.lock:
+            run_id = self._run_id(run_dir)
+            done = self.conn.execute("SELECT epochs_done FROM runs WHERE id = ?", (run_id,)).fetchone()[0] or 0
+            new_rows = [(run_id, epoch, *(row.get(column) for column in EPOCH_COLUMNS))
+                        for epoch, row in enumerate(rows[done:], done + 1)]
+            if not new_rows:
+                return 0
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO epochs (run_id, epoch, {', '.join(EPOCH_COLUMNS.values())}) "
+                f"VALUES (?, ?, {', '.join('?' * len(EPOCH_COLUMNS))})", new_rows)
+            last = rows[-1]
+            weights = next((str(path) for path in (Path(run_dir) / 'weights' / 'best.pt',
+                                                   Path(run_dir) / 'weights' / 'last.pt') if path.exists()), None)
+            self.conn.execute(
+                "UPDATE runs SET epochs_done = ?, mAP50 = ?, mAP50_95 = ?, precision = ?, recall = ?, "
+                "best_mAP50 = (SELECT MAX(mAP50) FROM epochs WHERE run_id = ?), weights = COALESCE(?, weights) "
+                "WHERE id = ?",
+                (len(rows), last.get('metrics/mAP50(B)'), last.get('metrics/mAP50-95(B)'),
+                 last.get('metrics/precision(B)'), last.get('metrics/recall(B)'), run_id, weights, run_id),
+            )
+            self.conn.commit()
+        return len(new_rows)
+
+    def finish_run(self, run_dir, status='finished', hours=0.0, error=None):
+        """Close a run as finished, stopped or failed after a last sync
+
+        `hours` is the time this attempt trained, resumed runs add up the time of all their attempts.
+        """
+        self.mtimes.pop(str(run_dir), None)
+        self.sync(run_dir)
+        with self.lock:
+            run_id = self._run_id(run_dir)
+            self.conn.execute(
+                "UPDATE runs SET status = ?, finished = ?, training_time = COALESCE(training_time, 0) + ?, "
+                "error = ? WHERE id = ?", (status, time.time(), hours or 0.0, error, run_id))
+            self.conn.commit()
+
+    def set_latency(self, run_dir, latency_ms, latency_p95_ms=None):
+        with self.lock:
+            self.conn.execute("UPDATE runs SET latency_ms = ?, latency_p95_ms = ? WHERE run_dir = ?",
+                              (latency_ms, latency_p95_ms, str(run_dir)))
+            self.conn.commit()
+
+    def run(self, run_dir):
+        """The registry row of a run as a dict, None if it is unknown"""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM runs WHERE run_dir = ?", (str(run_dir),)).fetchone()
+        return dict(row) if row else None
+
+    def metrics(self, run_dir):
+        """Latest metrics of a run in the experiment JSON format, zeros before its first epoch"""
+        row = self.run(run_dir) or {}
+        return {name: row.get(column) or 0.0 for name, column in
+                [('mAP50', 'mAP50'), ('mAP50-95', 'mAP50_95'), ('Precision', 'precision'), ('Recall', 'recall')]}
+
+    def epochs(self, run_dir):
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(
+                "SELECT epochs.* FROM epochs JOIN runs ON runs.id = epochs.run_id WHERE runs.run_dir = ? "
+                "ORDER BY epoch", (str(run_dir),))]
+
+    def epoch_values(self, epoch, metric='metrics/mAP50(B)', sweep=None):
+        """Metric of every run at an epoch as (run_dir, value), skipping runs that end there"""
+        column = EPOCH_COLUMNS[metric]
+        query = (f"SELECT runs.run_dir, epochs.{column} FROM epochs JOIN runs ON runs.id = epochs.run_id "
+                 f"WHERE epochs.epoch = ? AND epochs.{column} IS NOT NULL "
+                 f"AND (runs.epochs IS NULL OR runs.epochs > ?)")
+        values = [epoch, epoch]
+        if sweep:
+            query += " AND runs.sweep = ?"
+            values.append(sweep)
+        with self.lock:
+            return [tuple(row) for row in self.conn.execute(query, values)]
+
+    def best(self, metric='mAP50', max_latency_ms=None, where=None, sweep=None, status='finished', limit=1):
+        """Runs with the highest metric, optionally under a latency limit and matching config values
+
+        `where` maps hyperparameters to required values, e.g. {'optimizer': 'SGD', 'lr0': 0.01}.
+        """
+        column = METRICS[metric]
+        clauses, values = [f"runs.{column} IS NOT NULL"], []
+        if status:
+            clauses.append("runs.status = ?")
+            values.append(status)
+        if sweep:
+            clauses.append("runs.sweep = ?")
+            values.append(sweep)
+        if max_latency_ms is not None:
+            clauses.append("runs.latency_ms <= ?")
+            values.append(max_latency_ms)
+        for key, value in (where or {}).items():
+            number = _number(value)
+            if number is None:
+                clauses.append("runs.id IN (SELECT run_id FROM params WHERE key = ? AND value = ?)")
+                values += [key, str(value)]
+            else:
+                clauses.append("runs.id IN (SELECT run_id FROM params WHERE key = ? AND number = ?)")
+                values += [key, number]
+        order = 'ASC' if metric in ('latency_ms', 'training_time') else 'DESC'
+        query = (f"SELECT * FROM runs WHERE {' AND '.join(clauses)} ORDER BY runs.{column} {order} LIMIT ?")
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query, values + [limit])]
+
+    def ingest_run_dir(self, run_dir, name=None, sweep=None):
+        """Register an existing ultralytics run directory with the config from its args.yaml
+
+        Directories without a results.csv never trained an epoch and are skipped
+        without a row, returns whether the run was registered.
+        """
+        import yaml
+        run_dir = Path(run_dir).resolve()
+        if not (run_dir / 'results.csv').exists():
+            print(f"⚠️ Skipping {run_dir}: no results.csv")
+            return False
+        config = {}
+        if (run_dir / 'args.yaml').exists():
+            with open(run_dir / 'args.yaml', 'r') as f:
+                config = yaml.safe_load(f) or {}
+        rows = read_results(run_dir)
+        finished = (run_dir / 'weights' / 'best.pt').exists() and len(rows) >= config.get('epochs', 0)
+        self.start_run(run_dir, name or run_dir.name, config, sweep)
+        self.finish_run(run_dir, 'finished' if finished else 'failed',
+                        error=None if finished else 'Incomplete run directory')
+        # Newer ultralytics versions log the elapsed seconds of every epoch
+        if rows and rows[-1].get('time'):
+            with self.lock:
+                self.conn.execute("UPDATE runs SET training_time = ? WHERE run_dir = ?",
+                                  (rows[-1]['time'] / 3600, str(run_dir)))
+                self.conn.commit()
+        return True
+
+    def import_results_json(self, path, sweep=None):
+        """Import the runs of an experiment_results/optimization_results/baseline_results JSON file"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        sweep = sweep or Path(path).stem
+        # baseline_results.json holds one run, the others a list of experiments
+        experiments = data.get('experiments', [dict(data, name='baseline',
+                                                    config=data.get('training_config', {}), success=True)])
+        imported = 0
+        for exp in experiments:
+            run_dir = exp.get('run_dir') or f"{Path(path).resolve()}#{exp['name']}"
+            metrics = exp.get('metrics') or {}
+            status = 'stopped' if exp.get('stopped_epoch') else ('finished' if exp.get('success') else 'failed')
+            with self.lock:
+                run_id = self._run_id(run_dir, exp['name'], sweep)
+                config = exp.get('config') or {}
+                self.conn.execute(
+                    "UPDATE runs SET name = ?, sweep = ?, status = ?, config = ?, epochs = ?, training_time = ?, "
+                    "mAP50 = COALESCE(mAP50, ?), mAP50_95 = COALESCE(mAP50_95, ?), precision = COALESCE(precision, ?), "
+                    "recall = COALESCE(recall, ?), best_mAP50 = COALESCE(best_mAP50, ?), error = ? WHERE id = ?",
+                    (exp['name'], sweep, status, json.dumps(config, sort_keys=True), config.get('epochs'),
+                     exp.get('training_time', metrics.get('Training_Time_Hours')), metrics.get('mAP50'),
+                     metrics.get('mAP50-95'), metrics.get('Precision'), metrics.get('Recall'), metrics.get('mAP50'),
+                     exp.get('error'), run_id))
+                self._set_params(run_id, config)
+                self.conn.commit()
+            imported += 1
+        return imported
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+def measure_latency(weights, image_paths, imgsz=640, backend='torch', warmup=3):
+    """Mean and p95 single image CPU latency in ms of a run's weights"""
+    import cv2
+    import inference_backend
+    model = inference_backend.load_model(weights, backend, imgsz=imgsz)
+    images = [image for image in (cv2.imread(str(p)) for p in image_paths) if image is not None]
+    for image in images[:warmup]:
+        model.predict(image, imgsz=imgsz, device='cpu', verbose=False)
+    times = []
+    for image in images:
+        start = time.perf_counter()
+        model.predict(image, imgsz=imgsz, device='cpu', verbose=False)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.mean(times)), float(np.percentile(times, 95))
+
+
+def print_runs(runs):
+    if not runs:
+        print("No matching runs")
+        return
+    for run in runs:
+        latency = f"{run['latency_ms']:.1f} ms" if run['latency_ms'] is not None else 'n/a'
+        mAP50 = f"{run['mAP50']:.3f}" if run['mAP50'] is not None else 'n/a'
+        print(f"  {run['name']:<28} {run['status'] or '':<9} mAP@0.5 {mAP50}  latency {latency}  "
+              f"epochs {run['epochs_done']}/{run['epochs'] or '?'}  {run['weights'] or run['run_dir']}")
+
+
+def _where(pairs):
+    where = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition('=')
+        where[key] = value
+    return where
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query and fill the training run registry')
+    parser.add_argument('--registry', type=str, default=str(DEFAULT_REGISTRY), help='Registry database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    # register existing runs
+    ingest = commands.add_parser('ingest', help='Register existing run directories')
+    ingest.add_argument('run_dirs', nargs='+')
+    ingest.add_argument('--sweep', type=str, default=None, help='Sweep label of the runs')
+    imports = commands.add_parser('import', help='Import experiment/optimization/baseline results JSON files')
+    imports.add_argument('paths', nargs='+')
+    # latency of finished runs
+    latency = commands.add_parser('latency', help='Measure the CPU latency of finished runs that have none yet')
+    latency.add_argument('--images', type=int, default=50, help='Test images timed per run')
+    latency.add_argument('--imgsz', type=int, default=640, help='Inference image size')
+    latency.add_argument('--backend', type=str, default='torch', help='Inference backend')
+    latency.add_argument('--sweep', type=str, default=None, help='Only runs of this sweep')
+    # queries
+    best = commands.add_parser('best', help='Best runs, e.g. best --max-latency-ms 30 --where optimizer=SGD')
+    best.add_argument('--metric', type=str, default='mAP50', choices=list(METRICS), help='Ranking metric')
+    best.add_argument('--max-latency-ms', type=float, default=None, help='Only runs at most this slow')
+    best.add_argument('--where', type=str, nargs='*', help='Required hyperparameters as key=value')
+    best.add_argument('--sweep', type=str, default=None, help='Only runs of this sweep')
+    best.add_argument('--status', type=str, default='finished', help='Run status, empty for any')
+    best.add_argument('--limit', type=int, default=5, help='Number of runs shown')
+    args = parser.parse_args()
+
+    os.chdir(THIS_DIR)
+    registry = RunRegistry(args.registry)
+    if args.command == 'ingest':
+        for run_dir in args.run_dirs:
+            if registry.ingest_run_dir(run_dir, sweep=args.sweep):
+                print(f"✅ {run_dir}")
+    elif args.command == 'import':
+        for path in args.paths:
+            print(f"✅ {path}: {registry.import_results_json(path)} runs")
+    elif args.command == 'latency':
+        import yaml
+        with open('yolo_params.yaml', 'r') as file:
+            test_dir = Path(yaml.safe_load(file)['test']) / 'images'
+        image_paths = sorted(test_dir.iterdir())[:args.images]
+        for run in registry.best('mAP50', sweep=args.sweep, limit=-1):
+            if run['latency_ms'] is not None or not run['weights'] or not os.path.exists(run['weights']):
+                continue
+            mean_ms, p95_ms = measure_latency(run['weights'], image_paths, args.imgsz, args.backend)
+            registry.set_latency(run['run_dir'], mean_ms, p95_ms)
+            print(f"{run['name']}: {mean_ms:.1f} ms (p95 {p95_ms:.1f} ms)")
+    else:
+        start = time.perf_counter()
+        runs = registry.best(args.metric, args.max_latency_ms, _where(args.where), args.sweep, args.status or None,
+                             args.limit)
+        print(f"{'='*60}")
+        print(f"BEST RUNS BY {args.metric}" + (f" UNDER {args.max_latency_ms:g} MS" if args.max_latency_ms else ''))
+        print(f"{'='*60}")
+        print_runs(runs)
+        print(f"\nQuery time: {(time.perf_counter() - start) * 1000:.1f} ms")
+    registry.close()
@@ -0,0 +1,49 @@
+import csv
+import os
+
+
+def split_cores(workers):
+    """Split the cores this process may run on into `workers` disjoint contiguous slices"""
+    if hasattr(os, 'sched_getaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    workers = max(1, min(workers, len(cores)))
+    size, extra = divmod(len(cores), workers)
+    slices, start = [], 0
+    for rank in range(workers):
+        stop = start + size + (1 if rank < extra else 0)
+        slices.append(cores[start:stop])
+        start = stop
+    return slices
+
+
+def format_cores(cores):
+    return f"{cores[0]}-{cores[-1]}" if len(cores) > 1 else str(cores[0])
+
+
+def read_results(run_dir):
+    """Rows of a run's results.csv as {column: float} dicts, one per finished epoch"""
+    try:
+        with open(os.path.join(run_dir, 'results.csv'), 'r', newline='') as f:
+            rows = list(csv.reader(f))
+    except OSError:
+        return []
+    if not rows:
+        return []
+    # Older ultralytics versions pad the column names
+    header = [name.strip() for name in rows[0]]
+    results = []
+    for row in rows[1:]:
+        if len(row) != len(header):
+            break  # row still being written
+        try:
+            results.append({name: float(value) for name, value in zip(header, row)})
+        except ValueError:
+            break
+    return results
+
+
+def read_epoch_metrics(run_dir, column='metrics/mAP50(B)'):
+    """Per-epoch values of one results.csv column of a run, [] until its first epoch is written"""
+    return [row[column] for row in read_results(run_dir) if column in row]
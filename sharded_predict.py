@@ -0,0 +1,100 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+from pathlib import Path
+from detection_store import DetectionStoreReader, DetectionStoreWriter
+from run_utils import split_cores
+
+
+def _worker(rank, cores, model_path, part_path, shard_queue, done_queue, options):
+    # Pin the worker to its own cores and size torch's thread pool to match
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    import torch
+    torch.set_num_threads(len(cores))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    from inference_backend import load_model
+    from predict import predict_batch_and_save
+
+    model = load_model(model_path, options['backend'], imgsz=options['imgsz'], threads=len(cores))
+    with DetectionStoreWriter(part_path) as part:
+        while True:
+            shard = shard_queue.get()
+            if shard is None:
+                break
+            image_paths, output_paths, output_paths_txt = (list(column) for column in zip(*shard))
+            predict_batch_and_save(model, image_paths, output_paths, output_paths_txt,
+                                   conf=options['conf'], imgsz=options['imgsz'], batch_size=options['batch'],
+                                   render=options['render'], store=part, output_conf=options['output_conf'])
+            done_queue.put((rank, len(shard)))
+
+
+def predict_sharded(model_path, image_paths, output_paths, output_paths_txt, workers, store=None,
+                    backend='torch', conf=0.5, imgsz=640, batch_size=8, render=True, shard_size=64,
+                    part_dir='predictions', output_conf=None):
+    """Predict images with `workers` processes, each pinned to a disjoint slice of cores
+
+    Every worker loads the model once and pulls shards of images from a shared
+    queue. Label files are written per image by the workers; detections for
+    `store` are merged from the per-worker parts in input order, so the merged
+    output does not depend on scheduling. With `output_conf` images and label
+    files only get the detections at that confidence, `store` gets them all.
+    """
+    ctx = mp.get_context('spawn')
+    shard_queue = ctx.Queue()
+    done_queue = ctx.Queue()
+    jobs = list(zip((str(p) for p in image_paths), output_paths, output_paths_txt))
+    shards = [jobs[i:i + shard_size] for i in range(0, len(jobs), shard_size)]
+    for shard in shards:
+        shard_queue.put(shard)
+
+    core_slices = split_cores(workers)
+    part_paths = [os.path.join(part_dir, f'detections.part{rank}.bin') for rank in range(len(core_slices))]
+    for _ in core_slices:
+        shard_queue.put(None)
+    options = {'backend': backend, 'conf': conf, 'imgsz': imgsz, 'batch': batch_size, 'render': render,
+               'output_conf': output_conf}
+    processes = [ctx.Process(target=_worker, args=(rank, cores, str(model_path), part_paths[rank],
+                                                   shard_queue, done_queue, options), daemon=True)
+                 for rank, cores in enumerate(core_slices)]
+    for process in processes:
+        process.start()
+    print(f"Started {len(processes)} workers on cores {[f'{c[0]}-{c[-1]}' for c in core_slices]}")
+
+    start_time = time.perf_counter()
+    done = 0
+    while done < len(jobs):
+        try:
+            _, count = done_queue.get(timeout=1)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+            continue
+        done += count
+        print(f"Progress: {done}/{len(jobs)} images")
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start_time
+    failed = [rank for rank, process in enumerate(processes) if process.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"Prediction workers {failed} exited with an error")
+    print(f"Predicted {done} images in {elapsed:.2f} s ({done / elapsed if elapsed else 0:.1f} img/s)")
+
+    # Merge the per-worker detections in input order
+    readers = [DetectionStoreReader(path) for path in part_paths]
+    if store is not None:
+        for output_path in output_paths:
+            name = Path(output_path).name
+            for reader in readers:
+                if name in reader:
+                    store.write(name, reader.get(name), reader.shape(name))
+                    break
+    del readers
+    for path in part_paths:
+        os.remove(path)
+        os.remove(path + '.idx')
+    return done
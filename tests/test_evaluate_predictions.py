@@ -0,0 +1,73 @@
+import os
+import sys
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import evaluate_predictions as ep
+
+torch = pytest.importorskip('torch')
+metrics = pytest.importorskip('ultralytics.utils.metrics')
+from ultralytics.engine.validator import BaseValidator
+
+NC = 3
+
+
+def make_image(rng, n_gt=8, n_pred=40):
+    """Ground truth boxes plus jittered, duplicated and spurious predictions sorted by confidence like NMS output"""
+    # Clustered boxes, so predictions overlap several ground truth boxes and compete for them
+    gt_xy = rng.uniform(200, 300, (n_gt, 2))
+    gt_wh = rng.uniform(20, 120, (n_gt, 2))
+    gt_cls = rng.integers(0, NC, n_gt)
+    source = rng.integers(0, n_gt, n_pred)
+    pred_xy = gt_xy[source] + rng.normal(0, 15, (n_pred, 2))
+    pred_wh = gt_wh[source] * rng.uniform(0.7, 1.3, (n_pred, 2))
+    pred_cls = np.where(rng.random(n_pred) < 0.8, gt_cls[source], rng.integers(0, NC, n_pred))
+    # A few predictions far from any ground truth box
+    spurious = rng.random(n_pred) < 0.15
+    pred_xy[spurious] = rng.uniform(0, 600, (spurious.sum(), 2))
+    conf = np.sort(rng.uniform(0.001, 1.0, n_pred))[::-1]
+    gt_boxes = ep.xywh_to_xyxy(np.column_stack((gt_xy, gt_wh)))
+    pred_boxes = ep.xywh_to_xyxy(np.column_stack((pred_xy, pred_wh)))
+    return gt_cls, gt_boxes, pred_cls, pred_boxes, conf
+
+
+@pytest.fixture(scope='module')
+def images():
+    rng = np.random.default_rng(0)
+    return [make_image(rng) for _ in range(40)]
+
+
+def test_match_predictions_matches_ultralytics(images):
+    validator = SimpleNamespace(iouv=torch.linspace(0.5, 0.95, 10))
+    for gt_cls, gt_boxes, pred_cls, pred_boxes, _ in images:
+        iou = ep.box_iou(gt_boxes, pred_boxes)
+        expected = BaseValidator.match_predictions(validator, torch.from_numpy(pred_cls), torch.from_numpy(gt_cls),
+                                                   torch.from_numpy(iou))
+        np.testing.assert_array_equal(ep.match_predictions(pred_cls, gt_cls, iou), expected.numpy())
+
+
+def test_ap_per_class_matches_ultralytics(images):
+    tp = np.concatenate([ep.match_predictions(p, g, ep.box_iou(gb, pb)) for g, gb, p, pb, _ in images])
+    conf = np.concatenate([c for *_, c in images])
+    pred_cls = np.concatenate([p for _, _, p, _, _ in images])
+    target_cls = np.concatenate([g for g, *_ in images])
+    classes, precision, recall, ap = ep.ap_per_class(tp, conf, pred_cls, target_cls, NC)
+    _, _, p, r, _, expected_ap, expected_classes, *_ = metrics.ap_per_class(tp, conf, pred_cls, target_cls)
+    np.testing.assert_array_equal(classes, expected_classes)
+    np.testing.assert_allclose(ap, expected_ap, atol=1e-9)
+    np.testing.assert_allclose(precision, p, atol=1e-9)
+    np.testing.assert_allclose(recall, r, atol=1e-9)
+
+
+def test_evaluate_detections_ignores_empty_label_files(tmp_path):
+    (tmp_path / 'background.txt').write_text('')
+    (tmp_path / 'tool.txt').write_text('0 0.5 0.5 0.2 0.2\n')
+    detections = {
+        'background.png': (np.array([[1, 10, 10, 5, 5, 0.9]]), (100, 100)),
+        'tool.png': (np.array([[0, 50, 50, 20, 20, 0.8]]), (100, 100)),
+    }
+    result = ep.evaluate_detections(detections, tmp_path, NC)
+    assert result['mAP50'] > 0.99
+    assert result['confusion_matrix'][1][NC] == 1
@@ -9,6 +9,7 @@ import argparse
 from ultralytics import YOLO
 import os
 import sys
+from image_cache import cached_trainer
 
 if __name__ == '__main__': 
     parser = argparse.ArgumentParser()
@@ -26,10 +27,41 @@ if __name__ == '__main__':
     parser.add_argument('--lrf', type=float, default=LRF, help='Final learning rate')
     # single_cls
     parser.add_argument('--single_cls', type=bool, default=SINGLE_CLS, help='Single class training')
+    # image cache
+    parser.add_argument('--image-cache', action='store_true',
+                        help='Decode images once into memory mapped caches next to the image directories')
+    # run directory, results go to <project>/<name>
+    parser.add_argument('--project', type=str, default=None, help='Directory of the run directories')
+    parser.add_argument('--name', type=str, default=None,
+                        help='Run directory name, reused if it exists (default: train, train2, ...)')
+    # cpu resources
+    parser.add_argument('--threads', type=int, default=None, help='Torch threads (default: all cores)')
+    parser.add_argument('--workers', type=int, default=8, help='Dataloader workers')
+    # starting point
+    parser.add_argument('--weights', type=str, default=None,
+                        help='Starting weights (default: yolov8s.pt), e.g. a shared prefix checkpoint')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue <project>/<name> from its weights/last.pt if it has one (needs --name)')
     args = parser.parse_args()
-    this_dir = os.path.dirname(__file__)
+    this_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(this_dir)
-    model = YOLO(os.path.join(this_dir, "yolov8s.pt"))
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+    extra = {'trainer': cached_trainer()} if args.image_cache else {}
+    last = os.path.join(args.project or os.path.join('runs', 'detect'), args.name or '', 'weights', 'last.pt')
+    if args.resume and args.name and os.path.exists(last):
+        from ultralytics.nn.tasks import torch_safe_load
+        ckpt, _ = torch_safe_load(last)
+        # The optimizer is stripped and the epoch reset to -1 once a run is finished
+        if ckpt.get('epoch', -1) < 0:
+            print(f"✅ {args.name} already finished, nothing to resume")
+            sys.exit(0)
+        print(f"Resuming {args.name} after epoch {ckpt['epoch'] + 1}")
+        # Resuming restores every training argument from the checkpoint
+        YOLO(last).train(resume=True, **extra)
+        sys.exit(0)
+    model = YOLO(args.weights or os.path.join(this_dir, "yolov8s.pt"))
     results = model.train(
         data=os.path.join(this_dir, "yolo_params.yaml"), 
         epochs=args.epochs,
@@ -39,7 +71,12 @@ if __name__ == '__main__':
         optimizer=args.optimizer, 
         lr0 = args.lr0, 
         lrf = args.lrf, 
-        momentum=args.momentum
+        momentum=args.momentum,
+        project=args.project,
+        name=args.name,
+        exist_ok=args.name is not None,
+        workers=args.workers,
+        **extra
     )
 '''
 Mixup boost val pred but reduces test pred